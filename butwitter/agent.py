@@ -1,29 +1,637 @@
-from langchain_openai import ChatOpenAI
-from browser_use import Agent
-from dotenv import load_dotenv
+from progress import ProfileProgress, json_lines_output
+from session_state import HOME_URL, ensure_logged_in, is_logged_in
+import zygote
+import argparse
 import asyncio
+import json
+import os
+import re
 import sys
+import time
 
-load_dotenv()
+# browser_use takes seconds to import, so it and everything built on it is
+# only loaded once a job actually runs (see check_importtime.py)
+_cache = None
 
-llm = ChatOpenAI(model="gpt-4o")
 
+def get_cache():
+    global _cache
+    if _cache is None:
+        from profile_cache import ProfileCache
 
-async def get_twitter_profile(username):
-    agent = Agent(
-        task=f"go on x.com, login with username verdakorz and password Id203133! search for a user named {username}, click the top result to go to the profile of the user, once on the profile page and click on the button beside the three dots for the profile summary, and then copy all the text generated from the grok chat tab that appears in a div inside a floating window in the bottom right of the screen",
-        llm=llm,
+        _cache = ProfileCache()
+    return _cache
+
+
+def cached_profile(username, args, refresh=False):
+    # TwitterProfile JSON from the on-disk cache, None on a miss, with --no-cache
+    # or when the caller is revalidating a stale entry (`refresh`)
+    if args.no_cache or refresh:
+        return None
+    return get_cache().get(username)
+
+
+_selectors = None
+
+
+def get_selectors():
+    global _selectors
+    if _selectors is None:
+        from selector_cache import SelectorCache
+
+        _selectors = SelectorCache()
+    return _selectors
+
+
+_metrics = None
+
+
+def get_metrics():
+    global _metrics
+    if _metrics is None:
+        from run_metrics import RunMetrics
+
+        _metrics = RunMetrics()
+    return _metrics
+
+
+_trajectories = None
+
+
+def get_trajectories():
+    global _trajectories
+    if _trajectories is None:
+        from trajectory import TrajectoryStore
+
+        _trajectories = TrajectoryStore()
+    return _trajectories
+
+
+def new_browser(args):
+    from browser_use import Browser, BrowserConfig
+
+    return Browser(config=BrowserConfig(headless=args.headless))
+
+
+async def new_context(browser):
+    # Every context the agent drives skips images, video, fonts and trackers
+    # (see resource_policy.py, BLOCK_RESOURCES=0 turns it off)
+    from resource_policy import block_resources
+
+    browser_context = await browser.new_context()
+    await block_resources(browser_context)
+    return browser_context
+
+
+def credentials():
+    # Read when used rather than at import, so .env can set them
+    return os.getenv("X_USERNAME", "verdakorz"), os.getenv("X_PASSWORD", "Id203133!")
+
+
+def login_task():
+    username, password = credentials()
+    return f"go on x.com, login with username {username} and password {password}"
+SUMMARY_TASK = "click on the button beside the three dots for the profile summary, and then copy all the text generated from the grok chat tab that appears in a div inside a floating window in the bottom right of the screen. Return the profile's username, the summary as its description, and each post it mentions with its date, content and link"
+PROFILE_TASK = "search for a user named {username}, click the top result to go to the profile of the user, once on the profile page and " + SUMMARY_TASK
+
+
+async def login(browser_context):
+    from browser_use import Agent
+    from macros import run_macro
+    from model_tiers import run_tiered
+
+    # The scripted login covers the usual form; the agent is only needed when
+    # x.com adds a step to it (unusual-activity or email checks)
+    try:
+        await run_macro("login", await browser_context.get_current_page(), *credentials())
+        return
+    except Exception:
+        pass
+
+    async def attempt(llm, max_steps):
+        agent = Agent(
+            task=login_task() + ", then stop once the home timeline is showing",
+            llm=llm,
+            browser_context=browser_context,
+        )
+        return await agent.run(max_steps=max_steps)
+
+    async def validate(history):
+        if not await is_logged_in(await browser_context.get_current_page()):
+            raise RuntimeError("login agent finished without a logged in session")
+        return history
+
+    await run_tiered("login", attempt, validate, metrics=get_metrics())
+
+
+async def restore_or_login(browser_context):
+    # Reuse the saved x.com session when it is still valid, log in only when it isn't
+    await ensure_logged_in(browser_context, login)
+
+
+async def replay_profile_flow(browser_context, username, progress):
+    # Repeat the recorded search/open-profile/open-summary steps without the
+    # LLM. Returns the steps that replayed cleanly before the page diverged.
+    from trajectory import replay
+
+    store = get_trajectories()
+    steps = store.steps("profile")
+    if not steps:
+        return []
+    result = await replay(
+        browser_context, steps, {"username": username}, selectors=get_selectors(), credentials=credentials()
     )
-    result = await agent.run()
-    return result
+    store.note_replay("profile", result)
+    progress.emit({
+        "type": "progress",
+        "stage": "replay",
+        "replayed": result.replayed,
+        "total": result.total,
+        "seconds": round(result.seconds, 2),
+    })
+    return steps[:result.replayed]
+
+
+async def open_profile_directly(browser_context, username, progress):
+    # Fast path for names that are already exact handles: skip the search and
+    # its LLM steps when x.com/<username> is that user's profile
+    from x_pages import is_handle, open_profile
+
+    if not is_handle(username):
+        return False
+    page = await browser_context.get_current_page()
+    found = await open_profile(page, username)
+    progress.emit({"type": "progress", "stage": "direct", "found": found})
+    if found:
+        progress.stage("on_profile", url=page.url)
+    else:
+        # Start the search flow from where it was recorded
+        await page.goto(HOME_URL)
+        await page.wait_for_load_state()
+    return found
+
+
+def record_run(history, completion, progress, state_filters):
+    run = {
+        "steps": len(history.history),
+        "input_tokens": history.total_input_tokens(),
+        "early_exit": completion.profile is not None,
+        "timings": completion.timings,
+    }
+    for state_filter in state_filters:
+        run.update(state_filter.stats())
+    if run["early_exit"]:
+        # Without a baseline yet, the done step the model would have taken
+        # is the one step we know was saved
+        baseline = get_metrics().average_full_run_steps("profile")
+        run["saved_steps"] = max(1, round(baseline - run["steps"])) if baseline else 1
+        progress.emit({"type": "progress", "stage": "early_exit", "steps": run["steps"], "saved_steps": run["saved_steps"]})
+    get_metrics().record("profile", run)
+
+
+async def extract_from_network(browser_context, username, progress, timings):
+    # Build the profile from the user and timeline JSON x.com's own client
+    # loads for the profile page; only the Grok summary is read off the page,
+    # as plain text. None when the page or its payloads didn't turn up.
+    from macros import run_macro
+    from network_capture import NetworkCapture
+
+    capture = NetworkCapture(username)
+    session = await browser_context.get_session()
+    capture.attach(session.context)
+    try:
+        if not await open_profile_directly(browser_context, username, progress):
+            return None
+        await capture.wait()
+        try:
+            page = await browser_context.get_current_page()
+            summary = await run_macro(
+                "open_grok_summary", page, selectors=get_selectors(), emit=progress.emit, timings=timings
+            )
+        except Exception:
+            summary = ""
+    finally:
+        capture.detach()
+    profile = capture.profile(description=summary)
+    if profile:
+        progress.posts(profile)
+    progress.emit({
+        "type": "progress",
+        "stage": "network",
+        "found": profile is not None,
+        "posts": len(profile.posts) if profile else 0,
+    })
+    return profile
+
+
+async def get_twitter_profile(
+    username, browser_context=None, emit=None, replay=True, direct=True, extract="agent", model=None, screenshots=None
+):
+    from browser_use import Agent, Controller
+    from completion import ProfileCompletion
+    from macros import register_macros
+    from model_tiers import run_tiered
+    from page_state import install_state_filters, state_filters
+    from profile_schema import TwitterProfile, parse_profile
+    from selector_cache import register_actions
+    from trajectory import completed_summary, step_seconds, steps_from_history, templatable
 
+    progress = ProfileProgress(username, emit)
+    # Seconds spent in macros and page waits this run, for the run metrics
+    timings = {}
+    variables = {"username": username}
+    # Where the current attempt started from, for recording its trajectory
+    replayed = []
+    on_profile = False
+    if browser_context:
+        # Callers hand us contexts that are already logged in and sitting on x.com
+        progress.stage("logged_in")
+        if extract == "network":
+            profile = await extract_from_network(browser_context, username, progress, timings)
+            if profile:
+                get_cache().put(username, profile.model_dump_json())
+                return profile
+            # Fall back to the agent; x.com/<username> was already tried
+            direct = False
 
-async def main():
+    async def prepare(first):
+        # Bring the page to where the next attempt starts and describe that in
+        # its task. A later tier starts over from home rather than from
+        # wherever the failed attempt left the page.
+        nonlocal replayed, on_profile
+        if not browser_context:
+            return f"{login_task()} {PROFILE_TASK.format(username=username)}"
+        if not first:
+            page = await browser_context.get_current_page()
+            await page.goto(HOME_URL)
+            await page.wait_for_load_state()
+        replayed, on_profile = [], False
+        if direct:
+            on_profile = await open_profile_directly(browser_context, username, progress)
+        if replay and not on_profile:
+            replayed = await replay_profile_flow(browser_context, username, progress)
+        if on_profile:
+            return f"you are already logged in on x.com and on the profile page of {username}, " + SUMMARY_TASK
+        if replayed:
+            # Hand over to the LLM only from where the replay stopped
+            return (
+                "you are already logged in on x.com and these steps are already done: "
+                f"{completed_summary(replayed, variables)}. Continue from the current page with the rest of this task: "
+                + PROFILE_TASK.format(username=username)
+            )
+        return "you are already logged in on x.com, " + PROFILE_TASK.format(username=username)
+
+    # Constrains the done action to the TwitterProfile schema
+    controller = Controller(output_model=TwitterProfile)
+    register_actions(controller, get_selectors())
+    hint = register_macros(
+        controller,
+        ["login_to_x", "goto_profile", "open_grok_summary"],
+        get_selectors(),
+        credentials=None if browser_context else credentials(),
+        emit=progress.emit,
+        timings=timings,
+    )
+    completion = ProfileCompletion(username, timings)
+    filters = state_filters("profile", screenshots)
+
+    async def on_step_end(agent):
+        await progress.on_step_end(agent)
+        await completion.on_step_end(agent)
+
+    attempts = 0
+
+    async def attempt(llm, max_steps):
+        nonlocal attempts
+        attempts += 1
+        task = await prepare(first=attempts == 1)
+        agent = Agent(
+            task=task + hint,
+            llm=llm,
+            browser_context=browser_context,
+            controller=controller,
+        )
+        install_state_filters(agent, *filters)
+        return await agent.run(max_steps=max_steps, on_step_end=on_step_end)
+
+    async def validate(history):
+        return completion.profile or parse_profile(history)
+
+    # Cheap model first, the big one only when that run doesn't produce a profile
+    history, profile = await run_tiered(
+        "profile", attempt, validate, metrics=get_metrics(), emit=progress.emit, model=model
+    )
+    record_run(history, completion, progress, filters)
+    get_selectors().learn(history)
+    progress.posts(profile)
+    get_cache().put(username, profile.model_dump_json())
+
+    # Re-record whenever the LLM had to drive part of the navigation, so the
+    # next run replays the path that worked this time. Usernames that can't
+    # be told apart from the rest of a URL would leave a trajectory every
+    # later lookup replays wrong, so those runs aren't recorded.
+    urls = [entry.state.url for entry in history.history]
+    if browser_context and replay and not on_profile and templatable(variables, urls):
+        steps = replayed + steps_from_history(history, variables)
+        if steps != get_trajectories().steps("profile"):
+            get_trajectories().record("profile", steps, step_seconds(history))
+    return profile
+
+
+def lookup_options(args):
+    # get_twitter_profile keyword arguments from the command line flags
+    return {
+        "replay": not args.no_replay,
+        "direct": not args.no_direct,
+        "extract": args.extract,
+        "model": args.model,
+        "screenshots": args.screenshots,
+    }
+
+
+async def run_job(job, send, browser_context, args):
+    job_id = job.get("id")
+    options = lookup_options(args)
+    # A job may ask for its own screenshot policy
+    if job.get("screenshots"):
+        options["screenshots"] = job["screenshots"]
+    profile = await get_twitter_profile(
+        job["username"],
+        browser_context,
+        emit=lambda event: send({"id": job_id, **event}),
+        **options,
+    )
+    send({"id": job_id, "type": "result", "result": profile.model_dump_json()})
+
+
+async def run_pooled_job(job, send, pool, args):
+    job_id = job.get("id")
+    cached = cached_profile(job["username"], args, refresh=job.get("refresh", False))
+    if cached:
+        send({"id": job_id, "type": "result", "result": cached, "cached": True})
+        return
+    try:
+        # Errors propagate through borrow() so a failed context gets recycled
+        async with pool.borrow() as browser_context:
+            await run_job(job, send, browser_context, args)
+    except asyncio.CancelledError:
+        send({"id": job_id, "type": "error", "error": "cancelled"})
+    except Exception as e:
+        send({"id": job_id, "type": "error", "error": f"{type(e).__name__}: {e}"})
+
+
+def make_pool(args, size):
+    from browser_pool import BrowserPool
+    from resource_policy import block_resources
+
+    return BrowserPool(
+        size=size,
+        max_jobs=args.pool_recycle_after,
+        setup=block_resources,
+        login=restore_or_login,
+        is_healthy=is_logged_in,
+        headless=args.headless,
+    )
+
+
+async def run_worker(args):
+    send = json_lines_output()
+    pool = make_pool(args, args.pool_size)
+    await pool.start()
+
+    loop = asyncio.get_running_loop()
+    tasks = {}
+    send({"type": "ready", "pid": os.getpid(), "pool_size": args.pool_size})
+
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError as e:
+            send({"type": "error", "error": f"invalid job: {e}"})
+            continue
+
+        if job.get("type") == "cancel":
+            task = tasks.get(job.get("id"))
+            if task:
+                task.cancel()
+            continue
+        if "username" not in job:
+            send({"id": job.get("id"), "type": "error", "error": "job is missing 'username'"})
+            continue
+
+        task = asyncio.create_task(run_pooled_job(job, send, pool, args))
+        tasks[job.get("id")] = task
+        task.add_done_callback(lambda _, job_id=job.get("id"): tasks.pop(job_id, None))
+
+    # stdin closed: let in-flight jobs finish before exiting
+    if tasks:
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+    await pool.close()
+
+
+async def run_zygote_job(job, send, args):
+    # Runs inside a forked child: imports and the LLM client are inherited from
+    # the zygote, only the browser is started here
+    if "username" not in job:
+        send({"id": job.get("id"), "type": "error", "error": "job is missing 'username'"})
+        return
+    cached = cached_profile(job["username"], args, refresh=job.get("refresh", False))
+    if cached:
+        send({"id": job.get("id"), "type": "result", "result": cached, "cached": True})
+        return
+    browser = new_browser(args)
+    try:
+        browser_context = await new_context(browser)
+        await restore_or_login(browser_context)
+        await run_job(job, send, browser_context, args)
+    except Exception as e:
+        send({"id": job.get("id"), "type": "error", "error": f"{type(e).__name__}: {e}"})
+    finally:
+        await browser.close()
+
+
+def run_zygote(args):
+    send = json_lines_output()
+    # Pay for the heavy imports and client setup here, once, so every forked
+    # child inherits them
+    import browser_use  # noqa: F401
+    from model_tiers import get_llm, tiers
+
+    for tier in tiers("profile") + tiers("login"):
+        get_llm(tier["model"])
+    zygote.serve(
+        args.zygote,
+        lambda job, job_send: run_zygote_job(job, job_send, args),
+        max_children=args.zygote_max_children,
+        on_ready=lambda: send({"type": "ready", "pid": os.getpid(), "socket": args.zygote}),
+    )
+
+
+def read_usernames(source):
+    stream = sys.stdin if source == "-" else open(source)
+    try:
+        usernames = []
+        for line in stream:
+            username = re.sub(r"[^a-zA-Z0-9_]", "", line.split("#", 1)[0].strip().lstrip("@"))
+            if username and username not in usernames:
+                usernames.append(username)
+        return usernames
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+async def run_batch(args):
+    usernames = read_usernames(args.batch)
+    send = json_lines_output()
+    concurrency = max(1, min(args.concurrency, len(usernames) or 1))
+    pool = make_pool(args, concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = []
+    durations = []
+
+    async def lookup(username):
+        async with semaphore:
+            started = time.monotonic()
+            try:
+                cached = cached_profile(username, args)
+                if cached:
+                    result, from_cache = json.loads(cached), True
+                else:
+                    async with pool.borrow() as browser_context:
+                        profile = await get_twitter_profile(username, browser_context, **lookup_options(args))
+                    result, from_cache = profile.model_dump(), False
+                ok = True
+                message = {"type": "result", "username": username, "ok": True, "result": result, "cached": from_cache}
+            except Exception as e:
+                ok = False
+                message = {"type": "result", "username": username, "ok": False, "error": f"{type(e).__name__}: {e}"}
+            elapsed = time.monotonic() - started
+            durations.append(elapsed)
+            if not ok:
+                failures.append(username)
+            # Stream each result as soon as it finishes, in completion order
+            send({**message, "seconds": round(elapsed, 2)})
+
+    started = time.monotonic()
+    await pool.start()
+    try:
+        await asyncio.gather(*(lookup(username) for username in usernames))
+    finally:
+        await pool.close()
+
+    total = time.monotonic() - started
+    send({
+        "type": "summary",
+        "total": len(usernames),
+        "succeeded": len(usernames) - len(failures),
+        "failed": len(failures),
+        "failed_usernames": failures,
+        "concurrency": concurrency,
+        "wall_seconds": round(total, 2),
+        "profiles_per_minute": round(len(usernames) / total * 60, 2) if total else 0,
+        "mean_job_seconds": round(sum(durations) / len(durations), 2) if durations else 0,
+    })
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Look up a Twitter profile with a browser agent")
     # Get username from command line arguments or use default
-    username = sys.argv[1] if len(sys.argv) > 1 else "elonmusk"
-    result = await get_twitter_profile(username)
-    print(result)
+    parser.add_argument("username", nargs="?", default="elonmusk")
+    parser.add_argument("--progress", action="store_true",
+                        help="write NDJSON progress events, then the result, to stdout")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always run the agent instead of answering from the profile cache")
+    parser.add_argument("--no-replay", action="store_true",
+                        help="let the LLM drive every step instead of replaying the recorded trajectory")
+    parser.add_argument("--no-direct", action="store_true",
+                        help="always search for the user instead of opening x.com/<username> first")
+    parser.add_argument("--extract", choices=["agent", "network"], default=os.getenv("PROFILE_EXTRACT", "agent"),
+                        help="'network' builds the profile from x.com's own API responses, falling back to the agent")
+    parser.add_argument("--model", default=os.getenv("PROFILE_MODEL"),
+                        help="run every lookup on this model instead of escalating through the model tiers")
+    parser.add_argument("--screenshots", metavar="POLICY",
+                        help="when the model gets a screenshot: never, on_failure, always or every:N "
+                             "(default: SCREENSHOT_POLICY, else on_failure)")
+    parser.add_argument("--replay-stats", action="store_true",
+                        help="print trajectory replay success rate and time saved, then exit")
+    parser.add_argument("--selector-stats", action="store_true",
+                        help="print selector cache hit rates, then exit")
+    parser.add_argument("--llm-cache-stats", action="store_true",
+                        help="print cached LLM completions per step type, then exit")
+    parser.add_argument("--run-stats", action="store_true",
+                        help="print agent step counts, early exits, timings and per-model-tier results, then exit")
+    parser.add_argument("--worker", action="store_true", help="serve JSON-lines jobs on stdin/stdout")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="look up every username in FILE ('-' for stdin), one NDJSON result per line")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("BATCH_CONCURRENCY", "4")),
+                        help="lookups run at once in batch mode")
+    parser.add_argument("--zygote", metavar="SOCKET",
+                        help="pre-import everything once and fork a child per job received on this Unix socket")
+    parser.add_argument("--zygote-max-children", type=int, default=int(os.getenv("ZYGOTE_MAX_CHILDREN", "4")),
+                        help="jobs the zygote runs at once")
+    parser.add_argument("--pool-size", type=int, default=int(os.getenv("BROWSER_POOL_SIZE", "2")),
+                        help="logged-in browser contexts kept warm in worker mode")
+    parser.add_argument("--pool-recycle-after", type=int, default=int(os.getenv("BROWSER_POOL_RECYCLE_AFTER", "25")),
+                        help="jobs a pooled context serves before it is replaced")
+    parser.add_argument("--headless", action="store_true", default=os.getenv("BROWSER_HEADLESS") == "1")
+    return parser.parse_args()
+
+
+async def main(args):
+    if args.replay_stats:
+        print(json.dumps(get_trajectories().stats("profile"), indent=2))
+        return
+    if args.run_stats:
+        print(json.dumps(get_metrics().summary("profile"), indent=2))
+        return
+    if args.selector_stats:
+        print(json.dumps(get_selectors().stats(), indent=2))
+        return
+    if args.llm_cache_stats:
+        from model_tiers import get_llm_cache
+
+        cache = get_llm_cache()
+        print(json.dumps(cache.stats() if cache else {}, indent=2))
+        return
+    if args.worker:
+        await run_worker(args)
+        return
+    if args.batch:
+        await run_batch(args)
+        return
+
+    send = json_lines_output() if args.progress else None
+    result = cached_profile(args.username, args)
+    if not result:
+        browser = new_browser(args)
+        try:
+            browser_context = await new_context(browser)
+            await restore_or_login(browser_context)
+            profile = await get_twitter_profile(args.username, browser_context, emit=send, **lookup_options(args))
+        finally:
+            await browser.close()
+        result = profile.model_dump_json()
+    if send:
+        send({"type": "result", "result": result})
+    else:
+        print(result)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # Before parse_args, whose defaults come from the environment too
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    args = parse_args()
+    if args.zygote:
+        # Must fork from a process with no event loop running
+        run_zygote(args)
+    else:
+        asyncio.run(main(args))
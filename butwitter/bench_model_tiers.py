@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from model_tiers import tiers
+from run_metrics import RunMetrics
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SUITE_PATH = os.path.join(HERE, "fixtures", "tier_suite.txt")
+
+
+def isolated_env(tmp):
+    # Environment for one benchmarked configuration: run metrics, recorded
+    # trajectories, learned selectors and cached completions all start empty
+    # in `tmp`, so no configuration replays or reuses what an earlier one
+    # learned. Only the stored x.com session is shared.
+    return {
+        **os.environ,
+        "RUN_METRICS_PATH": os.path.join(tmp, "run_metrics.json"),
+        "TRAJECTORY_PATH": os.path.join(tmp, "trajectories.json"),
+        "SELECTOR_CACHE_PATH": os.path.join(tmp, "selector_cache.json"),
+        "PROFILE_CACHE_PATH": os.path.join(tmp, "profile_cache.sqlite3"),
+        "LLM_CACHE_PATH": os.path.join(tmp, "llm_cache.sqlite3"),
+        "LLM_CACHE_STEPS": "",
+        "LLM_CACHE_MODE": "on",
+    }
+
+
+def run_suite(suite, model, concurrency):
+    # Look up every username in `suite` with the caches and replay off, on one
+    # pinned model or (model=None) through the tiers, and return the run
+    # metrics it left
+    with tempfile.TemporaryDirectory() as tmp:
+        command = [sys.executable, os.path.join(HERE, "agent.py"), "--batch", suite, "--no-cache", "--no-replay",
+                   "--concurrency", str(concurrency)]
+        if model:
+            command += ["--model", model]
+        subprocess.run(command, env=isolated_env(tmp), stdout=subprocess.DEVNULL, check=False)
+        return RunMetrics(os.path.join(tmp, "run_metrics.json")).summary("profile")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the profile suite on each model tier alone and tiered, and compare")
+    parser.add_argument("--suite", default=SUITE_PATH, help="usernames to look up, one per line")
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--json", action="store_true", help="print the full per-tier metrics as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for model in [tier["model"] for tier in tiers("profile")] + [None]:
+        results[model or "tiered"] = run_suite(args.suite, model, args.concurrency)["tiers"]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':14} {'model':14} {'attempts':>8} {'success':>8} {'avg s':>7} {'avg $':>9}")
+    for mode, per_model in results.items():
+        for model, tier in per_model.items():
+            print(f"{mode:14} {model:14} {tier['attempts']:>8} {tier['success_rate']:>8} "
+                  f"{tier['average_seconds']:>7} {tier['average_cost_usd']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import glob
+import json
+import os
+import statistics
+import time
+
+from page_state import SNAPSHOT_DIR, compress, count_tokens
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Hand-written samples in browser_use's element list format; set
+# PAGE_STATE_SNAPSHOTS while running the agents to record real ones
+SAMPLES_DIR = os.path.join(HERE, "fixtures", "page_states")
+
+STEP_PROMPT = (
+    "You are a browser agent. Task: open the profile summary of the user shown and read it.\n"
+    "Interactive elements from current page:\n{state}\n"
+    "Reply with only the index of the element to click next."
+)
+
+
+def step_latency(llm, state, runs):
+    # Median seconds for one agent-sized completion over `state`
+    samples = []
+    for _ in range(runs):
+        started = time.monotonic()
+        llm.invoke(STEP_PROMPT.format(state=state))
+        samples.append(time.monotonic() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure prompt size (and optionally step latency) before and after page-state compression")
+    parser.add_argument("paths", nargs="*", help="snapshot files or directories (default: the samples and PAGE_STATE_SNAPSHOTS)")
+    parser.add_argument("--llm", metavar="MODEL", help="also time a completion over each state with this model")
+    parser.add_argument("--runs", type=int, default=3, help="completions per state and mode when timing, the median counts")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.paths or [SAMPLES_DIR] + ([SNAPSHOT_DIR] if SNAPSHOT_DIR else []):
+        paths += sorted(glob.glob(os.path.join(path, "**", "*.txt"), recursive=True)) if os.path.isdir(path) else [path]
+
+    llm = None
+    if args.llm:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        from model_tiers import get_llm
+
+        llm = get_llm(args.llm)
+
+    results = []
+    for path in paths:
+        with open(path) as f:
+            raw = f.read()
+        started = time.monotonic()
+        compressed = compress(raw)
+        result = {
+            "snapshot": os.path.basename(path),
+            # The fixtures are written by hand, so their numbers are only indicative
+            "hand_written": os.path.abspath(path).startswith(SAMPLES_DIR + os.sep),
+            "raw_tokens": count_tokens(raw),
+            "compressed_tokens": count_tokens(compressed),
+            "compress_ms": round((time.monotonic() - started) * 1000, 2),
+        }
+        result["reduction"] = round(1 - result["compressed_tokens"] / result["raw_tokens"], 3) if result["raw_tokens"] else 0
+        if llm:
+            result["raw_step_seconds"] = round(step_latency(llm, raw, args.runs), 2)
+            result["compressed_step_seconds"] = round(step_latency(llm, compressed, args.runs), 2)
+        results.append(result)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'snapshot':40} {'raw tok':>8} {'comp tok':>8} {'saved':>6} {'ms':>6}" + (f" {'raw s':>6} {'comp s':>6}" if llm else ""))
+    for r in results:
+        name = r["snapshot"][:38] + (" *" if r["hand_written"] else "")
+        line = f"{name:40} {r['raw_tokens']:>8} {r['compressed_tokens']:>8} {r['reduction']:>6.0%} {r['compress_ms']:>6}"
+        if llm:
+            line += f" {r['raw_step_seconds']:>6} {r['compressed_step_seconds']:>6}"
+        print(line)
+    if any(r["hand_written"] for r in results):
+        print("* hand-written sample, not a recorded page; set PAGE_STATE_SNAPSHOTS while the agents run to record real ones")
+
+
+if __name__ == "__main__":
+    main()
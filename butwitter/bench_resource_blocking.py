@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from resource_policy import load_policy
+
+# Pages the agents load on every run; x.com profiles show a login wall when
+# logged out, which still pulls in the full client bundle and media
+DEFAULT_URLS = ["https://x.com/elonmusk", "https://www.thingiverse.com/"]
+# How requests get blocked: not at all, with playwright routing (which turns
+# the HTTP cache off) or through CDP's Fetch domain (which keeps it)
+MODES = ["off", "route", "cdp"]
+
+
+async def load(context, url):
+    # One page load in `context`: (seconds until load, bytes, requests)
+    transferred = 0
+    requests = 0
+
+    async def on_finished(request):
+        nonlocal transferred, requests
+        requests += 1
+        try:
+            sizes = await request.sizes()
+            transferred += sizes["responseHeadersSize"] + sizes["responseBodySize"]
+        except Exception:
+            pass
+
+    context.on("requestfinished", on_finished)
+    page = await context.new_page()
+    started = time.monotonic()
+    await page.goto(url, wait_until="load", timeout=60000)
+    seconds = time.monotonic() - started
+    # Let late requests started by the load finish reporting their sizes
+    await page.wait_for_timeout(1000)
+    context.remove_listener("requestfinished", on_finished)
+    await page.close()
+    return seconds, transferred, requests
+
+
+async def new_context(browser, mode):
+    context = await browser.new_context()
+    policy = None
+    if mode != "off":
+        policy = load_policy()
+        await policy.install(context, use_cdp=mode == "cdp")
+    return context, policy
+
+
+async def bench(urls, runs, warm):
+    # Cold: every load in a fresh context. Warm: one context per URL and mode
+    # that loads it `runs + 1` times, the first (cold) load not counted, the
+    # way a pooled context serves job after job.
+    from playwright.async_api import async_playwright
+
+    results = []
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch()
+        for url in urls:
+            for mode in MODES:
+                samples = []
+                blocked = []
+                if warm:
+                    context, policy = await new_context(browser, mode)
+                    await load(context, url)
+                    for _ in range(runs):
+                        before = policy.stats["blocked"] if policy else 0
+                        samples.append(await load(context, url))
+                        blocked.append((policy.stats["blocked"] if policy else 0) - before)
+                    await context.close()
+                else:
+                    for _ in range(runs):
+                        context, policy = await new_context(browser, mode)
+                        samples.append(await load(context, url))
+                        blocked.append(policy.stats["blocked"] if policy else 0)
+                        await context.close()
+                results.append({
+                    "url": url,
+                    "mode": mode,
+                    "warm": warm,
+                    "load_seconds": round(statistics.median(s[0] for s in samples), 3),
+                    "kilobytes": round(statistics.median(s[1] for s in samples) / 1024, 1),
+                    "requests": statistics.median(s[2] for s in samples),
+                    "blocked": statistics.median(blocked),
+                })
+        await browser.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare page-load time and bytes transferred with and without resource blocking")
+    parser.add_argument("urls", nargs="*", default=DEFAULT_URLS)
+    parser.add_argument("--runs", type=int, default=3, help="loads per URL and mode, the median counts")
+    parser.add_argument("--warm", action="store_true",
+                        help="repeat the loads in one reused context, as the browser pool does, instead of fresh ones")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(bench(args.urls, args.runs, args.warm))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'url':40} {'mode':>5} {'load s':>8} {'KiB':>9} {'requests':>8} {'blocked':>7}")
+    for r in results:
+        print(f"{r['url'][:40]:40} {r['mode']:>5} {r['load_seconds']:>8} {r['kilobytes']:>9} "
+              f"{r['requests']:>8} {r['blocked']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import argparse
+import base64
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_model_tiers import isolated_env
+from model_tiers import tiers
+from run_metrics import RunMetrics
+from screenshots import shrink
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SUITE_PATH = os.path.join(HERE, "fixtures", "tier_suite.txt")
+POLICIES = ["never", "on_failure", "every:3", "always"]
+
+
+def flow_totals(summary, flow):
+    # Per job, across the model tiers it went through: success rate, seconds
+    # and input tokens, plus the screenshot bytes the profile flow counted
+    per_model = summary["tiers"]
+    jobs = per_model.get(tiers(flow)[0]["model"], {}).get("attempts") or max(
+        (tier["attempts"] for tier in per_model.values()), default=0
+    )
+    if not jobs:
+        return {"jobs": 0}
+    return {
+        "jobs": jobs,
+        "success_rate": round(sum(tier["successes"] for tier in per_model.values()) / jobs, 3),
+        "average_seconds": round(sum(tier["seconds"] for tier in per_model.values()) / jobs, 2),
+        "input_tokens_per_job": round(sum(tier["input_tokens"] for tier in per_model.values()) / jobs),
+        "screenshot_kib_sent": round(summary.get("screenshot_bytes_sent", 0) / 1024, 1),
+    }
+
+
+def run_profiles(suite, policy, concurrency):
+    # Look up every username in `suite` with the caches and replay off under one policy
+    with tempfile.TemporaryDirectory() as tmp:
+        subprocess.run(
+            [sys.executable, os.path.join(HERE, "agent.py"), "--batch", suite, "--no-cache", "--no-replay",
+             "--concurrency", str(concurrency), "--screenshots", policy],
+            env=isolated_env(tmp),
+            stdout=subprocess.DEVNULL,
+            check=False,
+        )
+        return flow_totals(RunMetrics(os.path.join(tmp, "run_metrics.json")).summary("profile"), "profile")
+
+
+def run_posts(text, policy, runs):
+    # Post `runs` tweets under one policy; each gets a suffix so x.com doesn't
+    # reject it as a duplicate. shitpost.py doesn't replay trajectories.
+    with tempfile.TemporaryDirectory() as tmp:
+        for run in range(runs):
+            subprocess.run(
+                [sys.executable, os.path.join(HERE, "shitpost.py"), f"{text} ({policy} {run + 1}/{runs} {int(time.time())})",
+                 "--screenshots", policy],
+                env=isolated_env(tmp),
+                stdout=subprocess.DEVNULL,
+                check=False,
+            )
+        return flow_totals(RunMetrics(os.path.join(tmp, "run_metrics.json")).summary("post"), "post")
+
+
+def bench_shrink(directory):
+    # Offline: how much re-encoding takes off saved PNG screenshots, and how long it takes
+    results = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.png"))):
+        with open(path, "rb") as f:
+            raw = base64.b64encode(f.read()).decode()
+        started = time.monotonic()
+        shrunk = shrink(raw)
+        results.append({
+            "file": os.path.basename(path),
+            "raw_kib": round(len(raw) / 1024, 1),
+            "sent_kib": round(len(shrunk) / 1024, 1) if shrunk else None,
+            "ms": round((time.monotonic() - started) * 1000),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare latency, success and tokens of the agent flows across screenshot policies")
+    parser.add_argument("--policies", nargs="+", default=POLICIES)
+    parser.add_argument("--suite", default=SUITE_PATH, help="usernames to look up, one per line")
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--post", metavar="TEXT",
+                        help="also run shitpost.py under each policy; this really posts the tweets")
+    parser.add_argument("--post-runs", type=int, default=3)
+    parser.add_argument("--images", metavar="DIR",
+                        help="only time and measure re-encoding the PNG screenshots in DIR, no agents")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    if args.images:
+        results = bench_shrink(args.images)
+        if args.json:
+            print(json.dumps(results, indent=2))
+            return
+        for r in results:
+            print(f"{r['file'][:40]:40} {r['raw_kib']:>8} KiB -> {r['sent_kib'] or 'dropped':>8} KiB {r['ms']:>5} ms")
+        sent = [r["sent_kib"] for r in results if r["sent_kib"]]
+        if sent:
+            print(f"median sent {statistics.median(sent)} KiB of {statistics.median(r['raw_kib'] for r in results)} KiB")
+        return
+
+    results = {"profile": {}, "post": {}}
+    for policy in args.policies:
+        results["profile"][policy] = run_profiles(args.suite, policy, args.concurrency)
+        if args.post:
+            results["post"][policy] = run_posts(args.post, policy, args.post_runs)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'flow':8} {'policy':12} {'jobs':>5} {'success':>8} {'avg s':>7} {'in tok/job':>10} {'shot KiB':>9}")
+    for flow, per_policy in results.items():
+        for policy, r in per_policy.items():
+            print(f"{flow:8} {policy:12} {r['jobs']:>5} {r.get('success_rate', '-'):>8} {r.get('average_seconds', '-'):>7} "
+                  f"{r.get('input_tokens_per_job', '-'):>10} {r.get('screenshot_kib_sent', '-'):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import glob
+import json
+import os
+import re
+import time
+
+from page_state import SNAPSHOT_DIR, StateDiffer, compress, count_tokens
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Hand-written sample session; set PAGE_STATE_SNAPSHOTS while running the
+# agents to record real ones (one directory per agent run)
+SESSIONS_DIR = os.path.join(HERE, "fixtures", "page_states", "sessions")
+# Fraction of the input price a prompt token is billed at when the provider
+# serves it from its prompt cache; 1.0 is no prompt caching
+CACHED_RATE = 1.0
+
+
+def replay_session(directory, llm=None, cached_rate=CACHED_RATE):
+    # Feed a recorded session's steps through compression and diffing, as the
+    # agent would, and measure each step. Billed tokens count the keyframe
+    # repeated in a request at `cached_rate`.
+    differ = StateDiffer()
+    keyframe = ""
+    steps = []
+    for path in sorted(glob.glob(os.path.join(directory, "step-*.txt"))):
+        host = re.match(r"step-\d+-(.+)\.txt$", os.path.basename(path)).group(1)
+        with open(path) as f:
+            compressed = compress(f.read())
+        keyframes = differ.keyframes
+        started = time.monotonic()
+        request_tokens, new_tokens = differ.request_tokens, differ.new_tokens
+        sent = differ.render(host, compressed)
+        seconds = time.monotonic() - started
+        # Without a message manager the differ hands keyframes back inline
+        is_keyframe = differ.keyframes > keyframes
+        if is_keyframe:
+            keyframe = sent
+        # Page-state tokens in this step's request, the keyframe included,
+        # and the ones the previous request didn't have
+        request_tokens = differ.request_tokens - request_tokens
+        new_tokens = differ.new_tokens - new_tokens
+        step = {
+            "step": os.path.basename(path),
+            "keyframe": is_keyframe,
+            "full_tokens": count_tokens(compressed),
+            "request_tokens": request_tokens,
+            "new_tokens": new_tokens,
+            "billed_tokens": round(new_tokens + cached_rate * (request_tokens - new_tokens)),
+            "diff_ms": round(seconds * 1000, 2),
+        }
+        if llm:
+            step["full_step_seconds"] = timed_completion(llm, compressed)
+            step["diffed_step_seconds"] = timed_completion(llm, sent if is_keyframe else f"{keyframe}\n\n{sent}")
+        steps.append(step)
+    return steps
+
+
+def timed_completion(llm, state):
+    started = time.monotonic()
+    llm.invoke(f"You are a browser agent. Page state:\n{state}\nReply with only the index of the element to click next.")
+    return round(time.monotonic() - started, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure tokens and time per step with and without page-state diffing")
+    parser.add_argument("sessions", nargs="*", help="session directories (default: the sample and PAGE_STATE_SNAPSHOTS)")
+    parser.add_argument("--llm", metavar="MODEL", help="also time a completion per step with this model")
+    parser.add_argument("--cached-rate", type=float, default=CACHED_RATE,
+                        help="fraction of the input price cached prompt tokens are billed at, "
+                             "e.g. 0.5 for OpenAI's gpt-4o models (default: 1.0, no prompt cache)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    sessions = args.sessions or sorted(
+        glob.glob(os.path.join(SESSIONS_DIR, "*")) + (glob.glob(os.path.join(SNAPSHOT_DIR, "*")) if SNAPSHOT_DIR else [])
+    )
+    llm = None
+    if args.llm:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        from model_tiers import get_llm
+
+        llm = get_llm(args.llm)
+
+    results = {os.path.basename(session): replay_session(session, llm, args.cached_rate) for session in sessions if os.path.isdir(session)}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for session, steps in results.items():
+        full = sum(step["full_tokens"] for step in steps)
+        sent = sum(step["request_tokens"] for step in steps)
+        new = sum(step["new_tokens"] for step in steps)
+        billed = sum(step["billed_tokens"] for step in steps)
+        print(f"{session}: {len(steps)} steps, {full} page-state tokens full, {sent} in the diffed requests "
+              f"of which {new} new since the previous request; billed {full} full vs {billed} diffed "
+              f"at cached rate {args.cached_rate} ({1 - billed / full if full else 0:.0%} saved)")
+        for step in steps:
+            line = (f"  {step['step']:28} {'key' if step['keyframe'] else 'diff':>4} "
+                    f"{step['full_tokens']:>6} -> {step['request_tokens']:>6} tokens ({step['new_tokens']:>6} new, "
+                    f"{step['billed_tokens']:>6} billed) {step['diff_ms']:>6} ms")
+            if llm:
+                line += f"  {step['full_step_seconds']}s -> {step['diffed_step_seconds']}s"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+from browser_use import Browser, BrowserConfig
+from browser_use.browser.context import BrowserContextConfig
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PooledContext:
+    def __init__(self, context):
+        self.context = context
+        self.jobs = 0
+
+
+class BrowserPool:
+    # Keeps `size` browser contexts launched and logged in. Jobs borrow one,
+    # it gets reset to `home_url` on return and replaced after `max_jobs` uses
+    # or a failed health check. `setup` runs on every new context before it
+    # loads anything. Contexts that fail are replaced in the background, with
+    # backoff, for as long as the pool is open; meanwhile acquire() fails
+    # fast when there are no contexts at all and waits at most
+    # `acquire_timeout` seconds otherwise.
+
+    def __init__(self, size=2, max_jobs=25, home_url="https://x.com/home", login=None, is_healthy=None, headless=False,
+                 setup=None, acquire_timeout=120):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.home_url = home_url
+        self.setup = setup
+        self.login = login
+        self.is_healthy = is_healthy
+        self.headless = headless
+        self.acquire_timeout = acquire_timeout
+        self.browser = None
+        self.idle = asyncio.Queue()
+        # Contexts that exist, idle or borrowed, and the replacements under way
+        self.live = 0
+        self.replacing = set()
+        self.last_error = None
+        self.stats = {"created": 0, "recycled": 0, "unhealthy": 0, "jobs": 0}
+
+    async def start(self):
+        self.browser = Browser(config=BrowserConfig(headless=self.headless))
+        contexts = await asyncio.gather(*(self._create() for _ in range(self.size)), return_exceptions=True)
+        for pooled in contexts:
+            if isinstance(pooled, Exception):
+                logger.warning(f"Failed to warm browser context: {pooled}")
+                self.last_error = pooled
+                self._spawn_replace()
+            else:
+                self.idle.put_nowait(pooled)
+
+    async def close(self):
+        for task in list(self.replacing):
+            task.cancel()
+        await asyncio.gather(*self.replacing, return_exceptions=True)
+        while not self.idle.empty():
+            await self._discard(self.idle.get_nowait())
+        if self.browser:
+            await self.browser.close()
+            self.browser = None
+
+    @asynccontextmanager
+    async def borrow(self):
+        pooled = await self.acquire()
+        failed = False
+        try:
+            yield pooled.context
+        except asyncio.CancelledError:
+            # A cancelled job (a speculative lookup nobody wants any more)
+            # leaves a perfectly good context; the reset on release is enough
+            raise
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await self.release(pooled, failed=failed)
+
+    async def acquire(self):
+        while True:
+            if self.idle.empty() and self.live == 0 and self.last_error is not None:
+                # Every context is gone and the last one couldn't be replaced
+                # (x.com login failing, say); waiting would hang the job
+                raise RuntimeError(f"No browser contexts available: {self.last_error}")
+            try:
+                pooled = await asyncio.wait_for(self.idle.get(), timeout=self.acquire_timeout)
+            except asyncio.TimeoutError:
+                raise RuntimeError(f"No browser context became free within {self.acquire_timeout}s") from None
+            if await self._check(pooled):
+                return pooled
+            self.stats["unhealthy"] += 1
+            logger.info("Browser context failed health check, replacing it")
+            await self._discard(pooled)
+            self._spawn_replace()
+
+    async def release(self, pooled, failed=False):
+        pooled.jobs += 1
+        self.stats["jobs"] += 1
+        if failed or pooled.jobs >= self.max_jobs:
+            self.stats["recycled"] += 1
+            await self._discard(pooled)
+            self._spawn_replace()
+            return
+        try:
+            await self._reset(pooled.context)
+        except Exception as e:
+            logger.info(f"Failed to reset browser context, replacing it: {e}")
+            await self._discard(pooled)
+            self._spawn_replace()
+            return
+        self.idle.put_nowait(pooled)
+
+    async def _create(self):
+        context = await self.browser.new_context(config=BrowserContextConfig())
+        try:
+            if self.setup:
+                await self.setup(context)
+            await self._reset(context)
+            if self.login:
+                await self.login(context)
+                await self._reset(context)
+        except BaseException:
+            await context.close()
+            raise
+        self.stats["created"] += 1
+        self.live += 1
+        return PooledContext(context)
+
+    def _spawn_replace(self):
+        # Kept so close() can cancel it
+        task = asyncio.create_task(self._replace())
+        self.replacing.add(task)
+        task.add_done_callback(self.replacing.discard)
+
+    async def _replace(self, max_delay=300):
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                self.idle.put_nowait(await self._create())
+                self.last_error = None
+                return
+            except Exception as e:
+                self.last_error = e
+                delay = min(max_delay, 2 ** attempt)
+                logger.warning(f"Failed to replace browser context (attempt {attempt}, retrying in {delay}s): {e}")
+                await asyncio.sleep(delay)
+
+    async def _discard(self, pooled):
+        self.live -= 1
+        try:
+            await pooled.context.close()
+        except Exception as e:
+            logger.debug(f"Error closing browser context: {e}")
+
+    async def _reset(self, context):
+        session = await context.get_session()
+        pages = session.context.pages
+        for page in pages[1:]:
+            await page.close()
+        page = pages[0] if pages else await session.context.new_page()
+        await page.goto(self.home_url)
+        await page.wait_for_load_state()
+
+    async def _check(self, pooled):
+        try:
+            page = await pooled.context.get_current_page()
+            await asyncio.wait_for(page.evaluate("1"), timeout=5)
+            if self.is_healthy:
+                return await self.is_healthy(page)
+            return True
+        except Exception as e:
+            logger.debug(f"Browser context health check error: {e}")
+            return False
@@ -0,0 +1,84 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = ["butwitter/agent.py", "butwitter/shitpost.py", "src/modelfinder.py"]
+
+# The standard library the entry points need anyway. Timed in the same run,
+# it makes the budget relative to this machine and its current load.
+REFERENCE = "import argparse, asyncio, json, os, re, sys, time"
+
+# Anything here showing up during `--help` means a heavy import leaked back to
+# module level
+DEFERRED_MODULES = ["langchain_openai", "langchain_core", "browser_use", "playwright", "openai"]
+
+
+def measure(script):
+    # Returns (total top-level import µs, set of imported module names) for
+    # `script --help`, or for REFERENCE when `script` is None
+    command = ["-c", REFERENCE] if script is None else [script, "--help"]
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *command],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{script} --help exited with {proc.returncode}: {proc.stderr[-2000:]}")
+
+    total = 0
+    modules = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        modules.add(name.strip())
+        # Only top-level entries, nested ones are already in their parent's cumulative time
+        if not name.startswith("  "):
+            total += int(cumulative)
+    return total, modules
+
+
+def timed_against_reference(script, runs):
+    # (median of the script's import time over REFERENCE's, taken from
+    # back-to-back pairs so both see the same machine load; the fastest run's
+    # µs; its imported modules)
+    ratios, totals = [], []
+    for _ in range(runs):
+        total, modules = measure(script)
+        reference, _ = measure(None)
+        ratios.append(total / reference)
+        totals.append(total)
+    return statistics.median(ratios), min(totals), modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check cold-start import time of the agent entry points against a budget")
+    parser.add_argument("--runs", type=int, default=5, help="runs per script, the median counts")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="allowed import time as a multiple of importing the standard library alone")
+    args = parser.parse_args()
+
+    failures = []
+    for script in ENTRY_POINTS:
+        ratio, total, modules = timed_against_reference(script, args.runs)
+
+        leaked = sorted(m for m in modules if m.split(".")[0] in DEFERRED_MODULES)
+        if leaked:
+            failures.append(f"{script}: heavy modules imported before a job runs: {', '.join(leaked)}")
+
+        if ratio > args.tolerance:
+            failures.append(f"{script}: cold start imports took {ratio:.2f}x the standard library alone, "
+                            f"budget is {args.tolerance}x")
+        print(f"{script}: {total} us, {ratio:.2f}x the standard library alone (budget {args.tolerance}x)")
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
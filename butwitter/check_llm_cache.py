@@ -0,0 +1,94 @@
+import argparse
+import os
+import sys
+import tempfile
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from llm_cache import CacheMiss, LLMResponseCache, track
+
+RESPONSES = ["click the username field", "click the home timeline", "open the search bar"]
+
+
+def prompt(url, time, screenshot="aGVsbG8="):
+    # A browser_use-shaped prompt: task, then the page state with a clock and a screenshot
+    return [
+        SystemMessage(content="You are a browser agent."),
+        HumanMessage(content="Your ultimate task is: log in to x.com"),
+        HumanMessage(content=[
+            {"type": "text", "text": f"Current url: {url}\nInteractive elements:\n[0]<input Phone, email or username />\n"
+                                     f"Current date and time: {time}"},
+            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{screenshot}"}},
+        ]),
+    ]
+
+
+LOGIN = "https://x.com/i/flow/login"
+HOME = "https://x.com/home"
+
+
+def model(cache):
+    # Answers RESPONSES in turn; a cached prompt doesn't use one up
+    return FakeListChatModel(responses=RESPONSES, cache=cache)
+
+
+def check(directory):
+    failures = []
+
+    def expect(name, actual, expected):
+        if actual != expected:
+            failures.append(f"{name}: expected {expected!r}, got {actual!r}")
+        print(f"{'ok  ' if actual == expected else 'FAIL'} {name}")
+
+    path = os.path.join(directory, "llm_cache.sqlite3")
+    cache = LLMResponseCache(path, steps="login")
+    llm = model(cache)
+    first = llm.invoke(prompt(LOGIN, "2026-01-01 10:00", "Zmlyc3Q=")).content
+    again = llm.invoke(prompt(LOGIN, "2026-03-02 17:45", "c2Vjb25k")).content
+    expect("same login page at another time, with another screenshot, is a hit", again, first)
+    llm.invoke(prompt(HOME, "2026-01-01 10:01"))
+    expect("home steps aren't cached when only login is opted in", sorted(cache.stats()), ["login"])
+
+    recorded = LLMResponseCache(path, mode="record")
+    llm = model(recorded)
+    llm.invoke(prompt(HOME, "2026-01-01 10:02"))
+    search = llm.invoke(prompt("https://x.com/explore", "2026-01-01 10:03")).content
+
+    # Offline replay: nothing past the cache, misses fail instead of asking the model
+    replay = LLMResponseCache(path, mode="replay")
+    llm = model(replay)
+    expect("replay answers from the recording, not the model's next response",
+           llm.invoke(prompt("https://x.com/explore", "2030-01-01 00:00")).content, search)
+    try:
+        llm.invoke(prompt("https://x.com/compose/post", "2026-01-01 10:04"))
+        expect("replay miss raises", "answered", "CacheMiss")
+    except CacheMiss:
+        expect("replay miss raises", "CacheMiss", "CacheMiss")
+
+    bounded = LLMResponseCache(os.path.join(directory, "bounded.sqlite3"), max_entries=2, steps="all")
+    llm = model(bounded)
+    for url in (LOGIN, HOME, "https://x.com/explore"):
+        llm.invoke(prompt(url, "2026-01-01 10:05"))
+    entries = {step: counts["entries"] for step, counts in bounded.stats().items()}
+    expect("eviction keeps max_entries", sum(entries.values()), 2)
+    expect("eviction drops the least recently used", entries.get("login", 0), 0)
+
+    with track() as keys:
+        llm.invoke(prompt("https://x.com/elonmusk", "2026-01-01 10:06"))
+    bounded.discard(keys)
+    expect("discard forgets a failed run's completions", bounded.stats().get("profile", {}).get("entries", 0), 0)
+    return failures
+
+
+def main():
+    argparse.ArgumentParser(description="Check the LLM completion cache's keys, opt-in, eviction and offline replay").parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        failures = check(directory)
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
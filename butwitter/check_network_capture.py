@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import urllib.request
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from network_capture import NetworkCapture, operation_name
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "x_api")
+FIXTURE_OPERATIONS = ["UserByScreenName", "UserTweets"]
+USERNAME = "fixtureperson"
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    # Answers /i/api/graphql/<query id>/<operation> with the recorded response
+    # for that operation, and / with a page that fetches them like x.com does
+
+    def do_GET(self):
+        if self.path == "/":
+            self._send("text/html", self.server.page.encode())
+            return
+        operation = operation_name(f"http://localhost{self.path}")
+        path = os.path.join(FIXTURES_DIR, f"{operation}.json")
+        if operation not in FIXTURE_OPERATIONS:
+            self.send_error(404)
+            return
+        with open(path, "rb") as f:
+            self._send("application/json", f.read())
+
+    def _send(self, content_type, body):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/i/api/graphql/fixtureQueryId/{operation}?variables=%7B%7D" for operation in FIXTURE_OPERATIONS]
+    server.page = "<script>" + "".join(f"fetch({json.dumps(url)});" for url in urls) + "</script>"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, base, urls
+
+
+def capture_over_http(urls):
+    # Fetch the fixtures from the local server and feed them through the
+    # same handler the browser hook uses
+    capture = NetworkCapture(USERNAME)
+    for url in urls:
+        with urllib.request.urlopen(url) as response:
+            capture.handle(url, json.load(response))
+    return capture
+
+
+async def capture_in_browser(base):
+    # Load a local page that fetches the fixtures, with the hook attached to a
+    # real playwright context
+    from playwright.async_api import async_playwright
+
+    capture = NetworkCapture(USERNAME)
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch()
+        context = await browser.new_context()
+        capture.attach(context)
+        page = await context.new_page()
+        await page.goto(base)
+        await capture.wait(timeout=10)
+        capture.detach()
+        await browser.close()
+    return capture
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check network-response profile extraction against recorded x.com responses")
+    parser.add_argument("--browser", action="store_true",
+                        help="also capture through a headless browser (needs playwright's chromium)")
+    args = parser.parse_args()
+
+    with open(os.path.join(FIXTURES_DIR, "expected_profile.json")) as f:
+        expected = json.load(f)
+
+    server, base, urls = start_server()
+    modes = {"http": lambda: capture_over_http(urls)}
+    if args.browser:
+        modes["browser"] = lambda: asyncio.run(capture_in_browser(base))
+
+    failures = []
+    try:
+        for mode, run in modes.items():
+            profile = run().profile()
+            actual = profile.model_dump() if profile else None
+            if actual != expected:
+                failures.append(f"{mode}: expected {json.dumps(expected)}, got {json.dumps(actual)}")
+            print(f"{mode}: {len(actual['posts']) if actual else 0} posts captured")
+    finally:
+        server.shutdown()
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
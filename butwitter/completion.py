@@ -0,0 +1,52 @@
+import logging
+
+from profile_schema import Post, TwitterProfile
+from x_pages import GROK_PANEL, grok_posts, profile_handle, visible_text, wait_for_quiet
+
+logger = logging.getLogger(__name__)
+
+# Anything shorter is a loading placeholder or an error, not a summary
+MIN_SUMMARY_CHARS = 200
+
+
+class ProfileCompletion:
+    # Watches the page after each agent step and stops the agent as soon as
+    # the Grok summary has finished streaming and its posts can be read
+    # straight off the page, instead of waiting for the model to call done.
+    # Time spent waiting on the panel is added to `timings`.
+
+    def __init__(self, username, timings=None):
+        self.username = username
+        self.timings = timings if timings is not None else {}
+        self.summary = ""
+        self.profile = None
+
+    async def on_step_end(self, agent):
+        if self.profile:
+            return
+        try:
+            page = await agent.browser_context.get_current_page()
+            if not await visible_text(page, GROK_PANEL):
+                return
+            # Let the stream finish here rather than spending agent steps on it
+            wait = await wait_for_quiet(page, GROK_PANEL)
+            self.timings["grok_wait"] = self.timings.get("grok_wait", 0.0) + wait["seconds"]
+            summary = await visible_text(page, GROK_PANEL)
+            # If it never went quiet, fall back to it not changing over a whole step
+            settled = not wait["timed_out"] or summary == self.summary
+            self.summary = summary
+            if not settled or len(summary) < MIN_SUMMARY_CHARS:
+                return
+            posts = [Post(**post) for post in await grok_posts(page) if post["content"]]
+            if not posts:
+                return
+            self.profile = TwitterProfile(
+                username=profile_handle(page.url) or self.username,
+                description=summary,
+                posts=posts,
+            )
+        except Exception as e:
+            logger.debug(f"Completion check failed: {e}")
+            return
+        logger.info("Profile fields captured from the page, stopping the agent early")
+        agent.stop()
@@ -0,0 +1,39 @@
+import fcntl
+import json
+import logging
+import os
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def load(path, what):
+    # The JSON object in `path`, {} when it is missing or unreadable
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable {what} {path}: {e}")
+        return {}
+
+
+def save(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def locked(path, what):
+    # Re-read `path` under an exclusive lock, yield it to be changed and
+    # write it back, so processes sharing the file (zygote children, the
+    # worker, the CLI) add to each other's changes instead of overwriting
+    # them. Nothing is written when the block raises.
+    with open(f"{path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        data = load(path, what)
+        yield data
+        save(path, data)
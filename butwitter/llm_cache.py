@@ -0,0 +1,229 @@
+import contextlib
+import contextvars
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from urllib.parse import urlparse
+
+from langchain_core.caches import BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration
+
+from page_state import StateDiffer
+from x_pages import page_type
+
+CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".llm_cache.sqlite3"),
+)
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+# Step types whose completions are cached, comma-separated (see step_type):
+# e.g. "login" or "login,home"; "all" for every step. Off when empty.
+CACHE_STEPS = os.getenv("LLM_CACHE_STEPS", "")
+# "on" caches the CACHE_STEPS steps; "record" caches every step; "replay"
+# answers every step from the cache and fails on a miss instead of calling
+# the API, for running the agents offline against recorded completions
+CACHE_MODE = os.getenv("LLM_CACHE_MODE", "on")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    step_type TEXT NOT NULL,
+    generations TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS completions_last_access ON completions (last_access);
+"""
+
+# Human messages carrying page state: browser_use's state message and the
+# state differ's keyframe
+_STATE_MARKERS = ("Current url:", StateDiffer.MARKER)
+_URL = re.compile(r"(?:Current url:|" + re.escape(StateDiffer.MARKER) + r" at) (\S+?):?\s")
+# Clock readings browser_use and the pages put in the prompt
+_VOLATILE = re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?")
+_MODEL_NAME = re.compile(r'"model_name": "([^"]+)"')
+
+
+# Keys of the completions stored by the current run, see track()
+_stored_keys = contextvars.ContextVar("llm_cache_stored_keys", default=None)
+
+
+def enabled(steps=CACHE_STEPS, mode=CACHE_MODE):
+    return mode != "on" or bool(steps.strip())
+
+
+class CacheMiss(LookupError):
+    pass
+
+
+def _normalize_text(text):
+    return re.sub(r"[ \t]+", " ", _VOLATILE.sub("<time>", text)).strip()
+
+
+def _normalize_content(content):
+    # Text of a message, screenshots replaced by a placeholder: the element
+    # listing already says what is on the page, and no two screenshots have
+    # the same bytes
+    if isinstance(content, str):
+        return _normalize_text(content)
+    parts = []
+    for part in content:
+        if isinstance(part, dict) and part.get("type") == "text":
+            parts.append(_normalize_text(part["text"]))
+        elif isinstance(part, dict) and part.get("type") == "image_url":
+            parts.append("<screenshot>")
+        else:
+            parts.append(_normalize_text(str(part)))
+    return "\n".join(parts)
+
+
+def _sha(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def step_type(url):
+    # What kind of step a prompt is for, by the page it was taken on: an
+    # x.com page type (login, home, search, profile, compose, other), or
+    # "external" for any other site
+    host = (urlparse(url).hostname or "").removeprefix("www.")
+    if host not in ("x.com", "twitter.com"):
+        return "external"
+    return page_type(url)
+
+
+def prompt_key(prompt, llm_string):
+    # (cache key, step type) for a serialized langchain prompt. The key hashes
+    # the model settings, the conversation without its page state, and the
+    # latest page state, each normalized so clock readings and screenshots
+    # don't make every prompt unique.
+    messages = json.loads(prompt)
+    conversation = []
+    page_state = ""
+    url = ""
+    for message in messages:
+        kwargs = message.get("kwargs", {})
+        text = _normalize_content(kwargs.get("content", ""))
+        entry = json.dumps([kwargs.get("type"), text, kwargs.get("tool_calls")], sort_keys=True, default=str)
+        if kwargs.get("type") == "human" and any(marker in text for marker in _STATE_MARKERS):
+            page_state += text
+            match = _URL.search(text + " ")
+            url = match.group(1) if match else url
+            entry = json.dumps(["page_state"])
+        conversation.append(entry)
+    key = ":".join((_sha(llm_string)[:16], _sha("\n".join(conversation)), _sha(page_state)))
+    return key, step_type(url)
+
+
+@contextlib.contextmanager
+def track():
+    # Collect the keys of the completions stored within the block, so a run
+    # that failed can take its answers back out with discard()
+    keys = []
+    token = _stored_keys.set(keys)
+    try:
+        yield keys
+    finally:
+        _stored_keys.reset(token)
+
+
+class LLMResponseCache(BaseCache):
+    # langchain cache of chat completions in SQLite, for the step types in
+    # `steps`. Past `max_entries` the least recently read ones are evicted.
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES, steps=CACHE_STEPS, mode=CACHE_MODE):
+        if mode not in ("on", "record", "replay"):
+            raise ValueError(f"Unknown LLM cache mode {mode!r}, expected on, record or replay")
+        self.max_entries = max_entries
+        self.steps = {step.strip() for step in steps.split(",") if step.strip()}
+        self.mode = mode
+        self.path = path
+        self._db = None
+        self._pid = None
+        self.hits = {}
+        self.misses = {}
+
+    @property
+    def db(self):
+        # The zygote creates the clients, and with them this cache, before it
+        # forks; a SQLite connection must not be shared with the children
+        if self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+            self._pid = os.getpid()
+        return self._db
+
+    def _cached_step(self, step):
+        return self.mode != "on" or "all" in self.steps or step in self.steps
+
+    def lookup(self, prompt, llm_string):
+        key, step = prompt_key(prompt, llm_string)
+        if not self._cached_step(step):
+            return None
+        row = self.db.execute("SELECT generations FROM completions WHERE key = ?", (key,)).fetchone()
+        if not row:
+            self.misses[step] = self.misses.get(step, 0) + 1
+            if self.mode == "replay":
+                raise CacheMiss(f"No recorded completion for this {step} step (key {key[:24]})")
+            return None
+        self.db.execute("UPDATE completions SET last_access = ? WHERE key = ?", (time.time(), key))
+        self.hits[step] = self.hits.get(step, 0) + 1
+        return [ChatGeneration(message=message) for message in messages_from_dict(json.loads(row[0]))]
+
+    def update(self, prompt, llm_string, return_val):
+        key, step = prompt_key(prompt, llm_string)
+        if self.mode == "replay" or not self._cached_step(step):
+            return
+        match = _MODEL_NAME.search(llm_string)
+        now = time.time()
+        self.db.execute(
+            "INSERT OR REPLACE INTO completions (key, model, step_type, generations, created_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, match.group(1) if match else "", step, json.dumps([message_to_dict(generation.message) for generation in return_val]), now, now),
+        )
+        self.db.execute(
+            "DELETE FROM completions WHERE key IN "
+            "(SELECT key FROM completions ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        if _stored_keys.get() is not None:
+            _stored_keys.get().append(key)
+
+    # Lookups are single-row SQLite reads; running them on the event loop
+    # keeps the connection on one thread
+    async def alookup(self, prompt, llm_string):
+        return self.lookup(prompt, llm_string)
+
+    async def aupdate(self, prompt, llm_string, return_val):
+        self.update(prompt, llm_string, return_val)
+
+    def discard(self, keys):
+        # Forget completions from a run that failed, so the next one asks the model again
+        if self.mode == "replay":
+            return
+        self.db.executemany("DELETE FROM completions WHERE key = ?", [(key,) for key in keys])
+
+    def clear(self, **kwargs):
+        self.db.execute("DELETE FROM completions")
+
+    def stats(self):
+        entries = dict(self.db.execute("SELECT step_type, COUNT(*) FROM completions GROUP BY step_type").fetchall())
+        return {
+            step: {
+                "entries": entries.get(step, 0),
+                "hits": self.hits.get(step, 0),
+                "misses": self.misses.get(step, 0),
+            }
+            for step in sorted(set(entries) | set(self.hits) | set(self.misses))
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+            self._pid = None
@@ -0,0 +1,175 @@
+import logging
+import time
+from urllib.parse import quote
+
+from x_pages import (
+    ACCOUNT_SWITCHER,
+    COMPOSE_TEXTAREA,
+    GROK_PANEL,
+    LOGIN_BUTTON,
+    LOGIN_PASSWORD_INPUT,
+    LOGIN_URL,
+    LOGIN_USERNAME_INPUT,
+    POST_BUTTON,
+    PROFILE_SUMMARY_BUTTON,
+    SEARCH_USER_CELL,
+    TOAST,
+    is_handle,
+    open_profile,
+    profile_handle,
+    visible_text,
+    wait_for_quiet,
+)
+
+logger = logging.getLogger(__name__)
+
+MACRO_TIMEOUT_MS = 15000
+
+
+# Per-process totals for every macro run: {name: {calls, failures, seconds}}
+_timings = {}
+
+
+def timings():
+    return {name: dict(timing) for name, timing in _timings.items()}
+
+
+async def login(page, username, password, selectors=None):
+    await page.goto(LOGIN_URL)
+    await page.locator(LOGIN_USERNAME_INPUT).fill(username, timeout=MACRO_TIMEOUT_MS)
+    await page.get_by_role("button", name="Next").click(timeout=MACRO_TIMEOUT_MS)
+    await page.locator(LOGIN_PASSWORD_INPUT).fill(password, timeout=MACRO_TIMEOUT_MS)
+    await page.locator(LOGIN_BUTTON).click(timeout=MACRO_TIMEOUT_MS)
+    await page.locator(ACCOUNT_SWITCHER).wait_for(timeout=MACRO_TIMEOUT_MS)
+    return "Logged in, the home timeline is showing"
+
+
+async def goto_profile(page, username, selectors=None):
+    if is_handle(username) and await open_profile(page, username):
+        return f"On the profile of @{username}"
+    # Not an exact handle: take the top account from x.com's people search
+    await page.goto(f"https://x.com/search?q={quote(username)}&f=user")
+    await page.locator(SEARCH_USER_CELL).first.click(timeout=MACRO_TIMEOUT_MS)
+    await page.wait_for_url(lambda url: profile_handle(url) is not None, timeout=MACRO_TIMEOUT_MS)
+    return f"On the profile of @{profile_handle(page.url)}"
+
+
+async def open_grok_summary(page, selectors=None):
+    button = await selectors.locate(page, "profile_summary") if selectors else None
+    if button is None:
+        button = page.locator(PROFILE_SUMMARY_BUTTON).first
+    await button.click(timeout=MACRO_TIMEOUT_MS)
+    await page.locator(GROK_PANEL).wait_for(state="visible", timeout=MACRO_TIMEOUT_MS)
+    # Grok streams the summary in; return it once the panel stops changing
+    await wait_for_quiet(page, GROK_PANEL)
+    return await visible_text(page, GROK_PANEL)
+
+
+async def compose_and_post(page, text, selectors=None):
+    await page.goto("https://x.com/compose/post")
+    box = await selectors.locate(page, "compose_box") if selectors else None
+    await (box or page.locator(COMPOSE_TEXTAREA).first).fill(text, timeout=MACRO_TIMEOUT_MS)
+    button = await selectors.locate(page, "post_button") if selectors else None
+    await (button or page.locator(POST_BUTTON).first).click(timeout=MACRO_TIMEOUT_MS)
+    await page.locator(TOAST).wait_for(timeout=MACRO_TIMEOUT_MS)
+    return "Posted"
+
+
+MACROS = {
+    "login": login,
+    "goto_profile": goto_profile,
+    "open_grok_summary": open_grok_summary,
+    "compose_and_post": compose_and_post,
+}
+
+# The agent action each macro is registered as (see register_macros), and
+# the macro it runs
+MACRO_ACTIONS = {
+    "login_to_x": "login",
+    "goto_profile": "goto_profile",
+    "open_grok_summary": "open_grok_summary",
+    "compose_and_post": "compose_and_post",
+}
+
+
+async def run_macro(name, page, *args, selectors=None, emit=None, timings=None):
+    # Run one macro, adding its wall time to the totals (and to the run's own
+    # `timings`, when given) and reporting it as a {"type": "progress",
+    # "stage": "macro"} event
+    started = time.monotonic()
+    ok = False
+    try:
+        result = await MACROS[name](page, *args, selectors=selectors)
+        ok = True
+        return result
+    finally:
+        seconds = time.monotonic() - started
+        timing = _timings.setdefault(name, {"calls": 0, "failures": 0, "seconds": 0.0})
+        timing["calls"] += 1
+        timing["failures"] += 0 if ok else 1
+        timing["seconds"] += seconds
+        if timings is not None:
+            timings[f"macro_{name}"] = timings.get(f"macro_{name}", 0.0) + seconds
+        logger.info(f"Macro {name} {'finished' if ok else 'failed'} in {seconds:.2f}s")
+        if emit:
+            emit({"type": "progress", "stage": "macro", "name": name, "ok": ok, "seconds": round(seconds, 2)})
+
+
+def macro_hint(actions):
+    # Appended to agent tasks so the model reaches for the one-step actions it has
+    if not actions:
+        return ""
+    return (
+        f" Whenever one of the one-step actions ({', '.join(actions)}) covers part of this,"
+        " use it instead of clicking through the page."
+    )
+
+
+def register_macros(controller, actions, selectors=None, credentials=None, emit=None, timings=None):
+    # Expose the named macro actions (login_to_x, goto_profile,
+    # open_grok_summary, compose_and_post) as single agent actions, so each
+    # flow's agent only gets the ones it needs; the profile lookup must never
+    # be able to post. login_to_x needs `credentials`, which stay in this
+    # closure: the model only gets to decide when to log in. Returns the
+    # task hint naming the actions registered.
+    from browser_use import ActionResult
+
+    registered = []
+
+    async def run(name, browser, *args):
+        page = await browser.get_current_page()
+        try:
+            result = await run_macro(name, page, *args, selectors=selectors, emit=emit, timings=timings)
+        except Exception as e:
+            return ActionResult(error=f"{name} failed: {e}. Do this step on the page instead")
+        return ActionResult(extracted_content=result, include_in_memory=True)
+
+    if "login_to_x" in actions and credentials:
+        @controller.action("Log in to x.com with the configured account in one step")
+        async def login_to_x(browser):
+            return await run("login", browser, *credentials)
+
+        registered.append("login_to_x")
+
+    if "goto_profile" in actions:
+        @controller.action("Open the x.com profile of a user in one step, searching for the name when it isn't an exact handle")
+        async def goto_profile(username: str, browser):
+            return await run("goto_profile", browser, username)
+
+        registered.append("goto_profile")
+
+    if "open_grok_summary" in actions:
+        @controller.action("On a profile page, open the Grok profile summary and return its text in one step")
+        async def open_grok_summary(browser):
+            return await run("open_grok_summary", browser)
+
+        registered.append("open_grok_summary")
+
+    if "compose_and_post" in actions:
+        @controller.action("Write and post a tweet with the given text in one step")
+        async def compose_and_post(text: str, browser):
+            return await run("compose_and_post", browser, text)
+
+        registered.append("compose_and_post")
+
+    return macro_hint(registered)
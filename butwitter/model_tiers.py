@@ -0,0 +1,135 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# JSON file with the same shape as DEFAULT_POLICY to replace it
+MODEL_POLICY_PATH = os.getenv("MODEL_POLICY")
+
+# Models to try per job type, cheapest first. A job moves to the next tier
+# when its run fails validation or uses up the tier's steps.
+DEFAULT_POLICY = {
+    "profile": [{"model": "gpt-4o-mini", "max_steps": 15}, {"model": "gpt-4o", "max_steps": 40}],
+    "post": [{"model": "gpt-4o-mini", "max_steps": 10}, {"model": "gpt-4o", "max_steps": 25}],
+    "login": [{"model": "gpt-4o-mini", "max_steps": 10}, {"model": "gpt-4o", "max_steps": 25}],
+    "modelfinder": [{"model": "gpt-4o-mini", "max_steps": 25}, {"model": "gpt-4o", "max_steps": 60}],
+}
+DEFAULT_MODEL = "gpt-4o"
+
+# USD per million (input, output) tokens
+PRICES = {"gpt-4o-mini": (0.15, 0.60), "gpt-4o": (2.50, 10.00)}
+
+# langchain_openai takes seconds to import, so clients are only created
+# once a job actually runs (see check_importtime.py)
+_llms = {}
+_llm_cache = None
+
+
+class DontEscalate(RuntimeError):
+    # Raised by `validate` when the failed attempt may already have had an
+    # effect (a posted tweet) that running it again on the next tier would repeat
+    pass
+
+
+def get_llm_cache():
+    # The completion cache every client shares, or None when it is off (see llm_cache.py)
+    global _llm_cache
+    if _llm_cache is None:
+        import llm_cache
+
+        if not llm_cache.enabled():
+            return None
+        _llm_cache = llm_cache.LLMResponseCache()
+    return _llm_cache
+
+
+def get_llm(model=DEFAULT_MODEL):
+    if model not in _llms:
+        from langchain_openai import ChatOpenAI
+
+        cache = get_llm_cache()
+        options = {"cache": cache} if cache else {}
+        if cache and cache.mode == "replay" and not os.getenv("OPENAI_API_KEY"):
+            # Replays never reach the API, but the client won't start without a key
+            options["api_key"] = "replay"
+        _llms[model] = ChatOpenAI(model=model, **options)
+    return _llms[model]
+
+
+def load_policy(path=MODEL_POLICY_PATH):
+    if not path:
+        return DEFAULT_POLICY
+    try:
+        with open(path) as f:
+            return {**DEFAULT_POLICY, **json.load(f)}
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable model policy {path}, using the default: {e}")
+        return DEFAULT_POLICY
+
+
+def tiers(job_type, model=None):
+    # The tiers for `job_type`; `model` pins a single one, with the step
+    # limit of the last (largest) tier
+    policy = load_policy().get(job_type) or [{"model": DEFAULT_MODEL, "max_steps": 40}]
+    if model:
+        return [{"model": model, "max_steps": policy[-1]["max_steps"]}]
+    return policy
+
+
+def token_usage(history):
+    # browser_use counts each step's input tokens but not the model's output,
+    # so output tokens are estimated from the length of its replies
+    input_tokens = history.total_input_tokens()
+    output_chars = sum(len(entry.model_output.model_dump_json()) for entry in history.history if entry.model_output)
+    return input_tokens, output_chars // 4
+
+
+def cost(model, input_tokens, output_tokens):
+    input_price, output_price = PRICES.get(model, PRICES[DEFAULT_MODEL])
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+async def run_tiered(job_type, attempt, validate, metrics=None, emit=None, model=None):
+    # Run `attempt(llm, max_steps)` -> history on each tier in turn until
+    # `await validate(history)` returns instead of raising. Returns
+    # (history, validated result); re-raises the last error when every tier
+    # failed or validate raised DontEscalate. Each attempt is added to
+    # `metrics` per model.
+    from llm_cache import track
+
+    last_error = None
+    cache = get_llm_cache()
+    for tier in tiers(job_type, model):
+        started = time.monotonic()
+        history = None
+        try:
+            with track() as cached_keys:
+                history = await attempt(get_llm(tier["model"]), tier["max_steps"])
+            result = await validate(history)
+            ok = True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            last_error = e
+            ok = False
+            if cache:
+                # Don't serve the next run the answers that led this one astray
+                cache.discard(cached_keys)
+        seconds = time.monotonic() - started
+        input_tokens, output_tokens = token_usage(history) if history else (0, 0)
+        if metrics:
+            metrics.record_tier(
+                job_type, tier["model"], ok, seconds, input_tokens, output_tokens,
+                cost(tier["model"], input_tokens, output_tokens),
+            )
+        if emit:
+            emit({"type": "progress", "stage": "model_tier", "model": tier["model"], "ok": ok, "seconds": round(seconds, 2)})
+        if ok:
+            return history, result
+        if isinstance(last_error, DontEscalate):
+            raise last_error
+        logger.info(f"{job_type} run on {tier['model']} failed ({last_error}), escalating")
+    raise last_error
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from urllib.parse import urlparse
+
+from profile_schema import Post, TwitterProfile
+
+logger = logging.getLogger(__name__)
+
+# GraphQL operations x.com's web client calls to render a profile page
+USER_OPERATION = "UserByScreenName"
+TIMELINE_OPERATIONS = ("UserTweets", "UserTweetsAndReplies")
+CAPTURE_TIMEOUT_SECONDS = 15
+
+
+def operation_name(url):
+    # "UserTweets" for https://x.com/i/api/graphql/<query id>/UserTweets?variables=...
+    parts = urlparse(url).path.strip("/").split("/")
+    if len(parts) == 5 and parts[:3] == ["i", "api", "graphql"]:
+        return parts[4]
+    return None
+
+
+def _screen_name(user):
+    # Newer payloads moved screen_name from `legacy` to `core`
+    return (user.get("core") or {}).get("screen_name") or (user.get("legacy") or {}).get("screen_name")
+
+
+def parse_user(payload):
+    user = payload["data"]["user"]["result"]
+    return {"username": _screen_name(user), "bio": user["legacy"].get("description", "")}
+
+
+def _tweet_results(instructions):
+    for instruction in instructions:
+        entries = instruction.get("entries") or ([instruction["entry"]] if "entry" in instruction else [])
+        for entry in entries:
+            content = entry.get("content", {})
+            # Threads come as modules holding several tweets
+            items = [item["item"] for item in content.get("items", [])] or [content]
+            for item in items:
+                result = item.get("itemContent", {}).get("tweet_results", {}).get("result")
+                if result:
+                    yield result
+
+
+def _post(result):
+    # Tweets from limited-visibility accounts are wrapped one level deeper
+    tweet = result.get("tweet", result)
+    legacy = tweet.get("legacy")
+    if not legacy:
+        return None
+    author = _screen_name(tweet["core"]["user_results"]["result"])
+    # Long posts are truncated in full_text, the whole text is in note_tweet
+    note = tweet.get("note_tweet", {}).get("note_tweet_results", {}).get("result", {})
+    return Post(
+        date=legacy["created_at"],
+        content=note.get("text") or legacy["full_text"],
+        link=f"https://x.com/{author}/status/{legacy['id_str']}",
+    )
+
+
+def parse_timeline(payload):
+    user = payload["data"]["user"]["result"]
+    timeline = (user.get("timeline_v2") or user.get("timeline"))["timeline"]
+    return [post for post in map(_post, _tweet_results(timeline["instructions"])) if post]
+
+
+class NetworkCapture:
+    # Collects the profile and timeline JSON x.com's own client fetches while
+    # a profile page loads, so the profile can be built without reading the
+    # rendered page
+
+    def __init__(self, username):
+        self.username = username
+        self.user = None
+        self.posts = {}
+        self.complete = asyncio.Event()
+        self._context = None
+
+    def handle(self, url, payload):
+        operation = operation_name(url)
+        try:
+            if operation == USER_OPERATION:
+                user = parse_user(payload)
+                if (user["username"] or "").lower() == self.username.lower():
+                    self.user = user
+            elif operation in TIMELINE_OPERATIONS:
+                for post in parse_timeline(payload):
+                    self.posts.setdefault(post.link, post)
+            else:
+                return
+        except (KeyError, TypeError) as e:
+            logger.info(f"Unexpected {operation} payload shape: {e}")
+            return
+        if self.user and self.posts:
+            self.complete.set()
+
+    async def _on_response(self, response):
+        if operation_name(response.url) not in (USER_OPERATION, *TIMELINE_OPERATIONS) or not response.ok:
+            return
+        try:
+            payload = await response.json()
+        except Exception as e:
+            logger.debug(f"Unreadable response from {response.url}: {e}")
+            return
+        self.handle(response.url, payload)
+
+    def attach(self, playwright_context):
+        self._context = playwright_context
+        playwright_context.on("response", self._on_response)
+
+    def detach(self):
+        if self._context:
+            self._context.remove_listener("response", self._on_response)
+            self._context = None
+
+    async def wait(self, timeout=CAPTURE_TIMEOUT_SECONDS):
+        try:
+            await asyncio.wait_for(self.complete.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def profile(self, description=None):
+        # The captured profile, or None when the user payload never arrived.
+        # `description` is the Grok summary when there is one, else the bio.
+        if not self.user:
+            return None
+        return TwitterProfile(
+            username=self.user["username"],
+            description=description or self.user["bio"],
+            posts=list(self.posts.values()),
+        )
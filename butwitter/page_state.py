@@ -0,0 +1,315 @@
+import logging
+import os
+import re
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+COMPRESS_PAGE_STATE = os.getenv("PAGE_STATE_COMPRESSION", "1") != "0"
+# Off by default: every request still carries the keyframe, so diffing only
+# pays off where the provider bills a cached prompt prefix for less (see
+# bench_state_diff.py --cached-rate)
+DIFF_PAGE_STATE = os.getenv("PAGE_STATE_DIFF", "0") == "1"
+# A full listing is sent at least this often, and whenever the URL changes
+# or the diff would be more than KEYFRAME_RATIO of the page
+KEYFRAME_EVERY = int(os.getenv("PAGE_STATE_KEYFRAME_EVERY", "5"))
+KEYFRAME_RATIO = 0.5
+# Directory to save every raw page state into, for bench_page_state.py
+SNAPSHOT_DIR = os.getenv("PAGE_STATE_SNAPSHOTS")
+
+# Element lines are mostly attributes, text lines may be the content the
+# agent is there to read, so they get more room
+MAX_ELEMENT_CHARS = 160
+MAX_TEXT_CHARS = 600
+# Containers (by data-testid) whose text is never capped: the Grok summary
+# the profile task has the model copy in full
+UNCAPPED_TESTIDS = ("GrokDrawer",)
+# Elements of the same shape kept before the rest are collapsed; on x.com
+# that is the first few timeline items
+MAX_SIMILAR = 5
+# Attributes that tell the model what an otherwise empty element is for
+_DESCRIPTIVE_ATTRIBUTES = ("aria-label", "placeholder", "title", "name", "alt", "value", "role", "type", "href")
+
+_ELEMENT_LINE = re.compile(r"^\s*\*?\[\d+\]<")
+
+
+def count_tokens(text):
+    try:
+        import tiktoken
+    except ImportError:
+        # Close enough for English-heavy page text
+        return len(text) // 4
+    return len(tiktoken.get_encoding("o200k_base").encode(text))
+
+
+def install_state_filters(agent, *filters):
+    # Run each filter on browser_use's BrowserState right before the agent
+    # turns it into the next step's prompt
+    manager = getattr(agent, "_message_manager", None) or agent.message_manager
+    add_state_message = manager.add_state_message
+    for state_filter in filters:
+        if hasattr(state_filter, "attach"):
+            state_filter.attach(manager)
+
+    def filtered_add_state_message(state, *args, **kwargs):
+        # The previous step's action results, for filters that act on failures
+        result = args[0] if args else kwargs.get("result")
+        for state_filter in filters:
+            try:
+                if hasattr(state_filter, "on_result"):
+                    state_filter.on_result(result)
+                state_filter(state)
+            except Exception as e:
+                # A filter must never cost the step, the unfiltered state still works
+                logger.warning(f"Page state filter {type(state_filter).__name__} failed: {e}")
+        return add_state_message(state, *args, **kwargs)
+
+    manager.add_state_message = filtered_add_state_message
+
+
+def _shape(line):
+    # An element line without its index and with every number masked, so the
+    # same control in every timeline item ("12 Replies. Reply") has one shape
+    # while differently labelled controls keep theirs
+    return re.sub(r"\d+", "#", re.sub(r"^\s*\*?\[\d+\]", "", line))
+
+
+def _is_empty_element(line):
+    # An element with no text and nothing describing it
+    match = re.match(r"^\s*\*?\[\d+\]<(\w+)([^>]*)>(.*)$", line)
+    if not match:
+        return False
+    attributes, rest = match.group(2), match.group(3)
+    text = re.sub(r"</?\w+\s*/?>", "", rest).strip(" />")
+    return not text and not any(f"{name}=" in attributes for name in _DESCRIPTIVE_ATTRIBUTES)
+
+
+def _cap(line, limit):
+    return line if len(line) <= limit else line[:limit] + "…"
+
+
+def compress(text, max_similar=MAX_SIMILAR, uncapped=frozenset()):
+    # Shrink browser_use's element list: drop empty elements, cap long lines
+    # (except text lines in `uncapped`) and collapse runs of same-shaped
+    # elements (repeated timeline items), along with the text that belongs
+    # to them
+    seen = Counter()
+    kept = []
+    omitted = 0
+    collapsing = False
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        is_element = bool(_ELEMENT_LINE.match(line))
+        if is_element:
+            if _is_empty_element(line):
+                continue
+            shape = _shape(line)
+            seen[shape] += 1
+            collapsing = seen[shape] > max_similar
+        if collapsing:
+            omitted += 1
+            continue
+        if not is_element and line.strip() in uncapped:
+            kept.append(line)
+            continue
+        kept.append(_cap(line, MAX_ELEMENT_CHARS if is_element else MAX_TEXT_CHARS))
+    if omitted:
+        kept.append(f"... {omitted} more lines repeating the elements above - scroll or extract content to see them ...")
+    return "\n".join(kept)
+
+
+def prune_offscreen(node):
+    # Un-highlight interactive elements outside the viewport so they aren't
+    # listed; they come back on the step after the agent scrolls to them
+    if getattr(node, "is_in_viewport", True) is False and getattr(node, "highlight_index", None) is not None:
+        node.highlight_index = None
+    for child in getattr(node, "children", []):
+        prune_offscreen(child)
+
+
+def panel_texts(node, testids=UNCAPPED_TESTIDS, inside=False):
+    # The text of every text node inside an element with one of `testids`
+    texts = set()
+    inside = inside or getattr(node, "attributes", {}).get("data-testid") in testids
+    if inside and getattr(node, "text", None):
+        texts.add(node.text.strip())
+    for child in getattr(node, "children", []):
+        texts |= panel_texts(child, testids, inside)
+    return texts
+
+
+class PageStateCompressor:
+    # State filter that serves the agent a compressed element list, counting
+    # tokens before and after
+
+    def __init__(self, snapshot_dir=None):
+        self.snapshot_dir = snapshot_dir
+        self.raw_tokens = 0
+        self.sent_tokens = 0
+        self.seconds = 0.0
+        self.steps = 0
+
+    def __call__(self, state):
+        tree = state.element_tree
+        prune_offscreen(tree)
+        to_string = tree.clickable_elements_to_string
+
+        def compressed_to_string(*args, **kwargs):
+            raw = to_string(*args, **kwargs)
+            started = time.monotonic()
+            text = compress(raw, uncapped=panel_texts(tree))
+            self.seconds += time.monotonic() - started
+            self.raw_tokens += count_tokens(raw)
+            self.sent_tokens += count_tokens(text)
+            self.steps += 1
+            if self.snapshot_dir:
+                save_snapshot(self.snapshot_dir, self.steps, state.url, raw)
+            return text
+
+        tree.clickable_elements_to_string = compressed_to_string
+
+    def stats(self):
+        return {"state_tokens_raw": self.raw_tokens, "state_tokens_sent": self.sent_tokens}
+
+
+def save_snapshot(directory, step, url, text):
+    # One file per step, so a session's directory replays in order
+    os.makedirs(directory, exist_ok=True)
+    host = (urlparse(url).hostname or "page").removeprefix("www.")
+    with open(os.path.join(directory, f"step-{step:03d}-{host}.txt"), "w") as f:
+        f.write(text)
+
+
+def _history(manager):
+    # Where the message manager keeps its messages moved between releases
+    return manager.state.history if hasattr(manager, "state") else manager.history
+
+
+def diff_lines(previous, current):
+    # (added or changed lines in page order, lines no longer on the page)
+    before, after = set(previous), set(current)
+    return [line for line in current if line not in before], [line for line in previous if line not in after]
+
+
+class StateDiffer:
+    # State filter that keeps the last full element listing (the keyframe)
+    # in the conversation as its own message and sends each step only what
+    # changed since then. The keyframe is still part of every request, so
+    # what diffing saves in billed tokens depends on the provider's prompt
+    # cache covering that stable prefix; stats() counts both the page-state
+    # tokens in each request and the ones new since the previous request.
+
+    MARKER = "Full listing of the page's interactive elements"
+
+    def __init__(self, keyframe_every=KEYFRAME_EVERY, keyframe_ratio=KEYFRAME_RATIO):
+        self.keyframe_every = keyframe_every
+        self.keyframe_ratio = keyframe_ratio
+        self.keyframes = 0
+        self.diff_steps = 0
+        self.full_tokens = 0
+        self.request_tokens = 0
+        self.new_tokens = 0
+        # Set after the message manager didn't take a keyframe; from then on
+        # every step gets the full listing
+        self.failed = False
+        self.attach(None)
+
+    def attach(self, manager):
+        # Every agent (one per model tier) starts from a fresh keyframe
+        self.manager = manager
+        self.keyframe = None
+        self.keyframe_url = None
+        self.keyframe_tokens = 0
+        self.since_keyframe = 0
+
+    def _keep_keyframe(self, url, text):
+        from langchain_core.messages import HumanMessage
+
+        history = _history(self.manager)
+        for index in reversed(range(len(history.messages))):
+            content = history.messages[index].message.content
+            if isinstance(content, str) and content.startswith(self.MARKER):
+                history.remove_message(index)
+        self.manager._add_message_with_tokens(HumanMessage(content=f"{self.MARKER} at {url}:\n{text}"))
+
+    def render(self, url, text):
+        # The state message for this step. Without a message manager the
+        # keyframe comes back inline and the caller keeps it (the bench does).
+        lines = text.splitlines()
+        tokens = count_tokens(text)
+        self.full_tokens += tokens
+        added, removed = diff_lines(self.keyframe or [], lines)
+        if (
+            self.keyframe is None
+            or url != self.keyframe_url
+            or self.since_keyframe + 1 >= self.keyframe_every
+            or len(added) + len(removed) > self.keyframe_ratio * max(len(lines), 1)
+        ):
+            if self.manager is not None:
+                self._keep_keyframe(url, text)
+            self.keyframe, self.keyframe_url, self.keyframe_tokens, self.since_keyframe = lines, url, tokens, 0
+            self.keyframes += 1
+            self.request_tokens += tokens
+            self.new_tokens += tokens
+            return text if self.manager is None else "Unchanged since the full listing above."
+        self.since_keyframe += 1
+        self.diff_steps += 1
+        if not added and not removed:
+            message = "Unchanged since the full listing above."
+        else:
+            message = "\n".join(
+                ["Changes since the full listing above (everything not mentioned is unchanged):"]
+                + [f"+ {line}" for line in added]
+                + [f"- {line[:80]}" for line in removed]
+            )
+        message_tokens = count_tokens(message)
+        # The keyframe is sent again with every request
+        self.request_tokens += self.keyframe_tokens + message_tokens
+        self.new_tokens += message_tokens
+        return message
+
+    def _render_or_full(self, url, text):
+        if self.failed:
+            return text
+        try:
+            return self.render(url, text)
+        except Exception as e:
+            # This leans on message manager internals that move between
+            # browser_use releases; the full listing always works
+            logger.warning(f"Page state diffing failed, sending full listings from now on: {e}")
+            self.failed = True
+            return text
+
+    def __call__(self, state):
+        tree = state.element_tree
+        to_string = tree.clickable_elements_to_string
+        tree.clickable_elements_to_string = (
+            lambda *args, **kwargs: self._render_or_full(state.url, to_string(*args, **kwargs))
+        )
+
+    def stats(self):
+        return {
+            "keyframes": self.keyframes,
+            "diff_steps": self.diff_steps,
+            "state_tokens_undiffed": self.full_tokens,
+            "state_tokens_diffed": self.request_tokens,
+            "state_tokens_new": self.new_tokens,
+        }
+
+
+def state_filters(job_type=None, screenshots=None):
+    # The filters every agent installs, per the environment; the differ goes
+    # last so it diffs the compressed listing. `screenshots` is the job's
+    # screenshot policy (see screenshots.py).
+    from screenshots import ScreenshotPolicy, policy_for
+
+    filters = [ScreenshotPolicy(policy_for(job_type, screenshots))]
+    if COMPRESS_PAGE_STATE:
+        session_dir = os.path.join(SNAPSHOT_DIR, str(time.time_ns())) if SNAPSHOT_DIR else None
+        filters.append(PageStateCompressor(snapshot_dir=session_dir))
+    if DIFF_PAGE_STATE:
+        filters.append(StateDiffer())
+    return filters
@@ -0,0 +1,69 @@
+import json
+import os
+import re
+import sqlite3
+import time
+
+# Shared with profileCache.ts, which reads the same file before asking the agent
+CACHE_PATH = os.getenv(
+    "PROFILE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".profile_cache.sqlite3"),
+)
+CACHE_TTL_SECONDS = float(os.getenv("PROFILE_CACHE_TTL", "3600"))
+CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "500"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    username TEXT PRIMARY KEY,
+    profile TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS profiles_last_access ON profiles (last_access);
+"""
+
+
+def normalize_username(username):
+    return re.sub(r"[^a-z0-9_]", "", username.strip().lstrip("@").lower())
+
+
+class ProfileCache:
+    # Profiles keyed by normalized username. Entries older than `ttl` are
+    # misses; past `max_entries` the least recently read ones are evicted.
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.db = sqlite3.connect(path, timeout=5, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username, now=None):
+        # Returns the cached TwitterProfile JSON, or None when missing or expired
+        now = now or time.time()
+        key = normalize_username(username)
+        row = self.db.execute("SELECT profile, fetched_at FROM profiles WHERE username = ?", (key,)).fetchone()
+        if not row or now - row[1] > self.ttl:
+            self.misses += 1
+            return None
+        self.db.execute("UPDATE profiles SET last_access = ? WHERE username = ?", (now, key))
+        self.hits += 1
+        return row[0]
+
+    def put(self, username, profile_json, now=None):
+        now = now or time.time()
+        json.loads(profile_json)  # never store something the readers can't parse
+        self.db.execute(
+            "INSERT OR REPLACE INTO profiles (username, profile, fetched_at, last_access) VALUES (?, ?, ?, ?)",
+            (normalize_username(username), profile_json, now, now),
+        )
+        self.db.execute(
+            "DELETE FROM profiles WHERE username IN "
+            "(SELECT username FROM profiles ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def close(self):
+        self.db.close()
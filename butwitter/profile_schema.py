@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field
+
+
+# Mirrors the TwitterProfile interface in twitterAgent.ts
+class Post(BaseModel):
+    date: str = Field(description="when the post was made, as shown on x.com")
+    content: str = Field(description="full text of the post")
+    link: str = Field(default="", description="URL of the post, empty if not shown")
+
+
+class TwitterProfile(BaseModel):
+    username: str = Field(description="the profile's @handle without the @")
+    description: str = Field(description="the profile summary text generated in the grok chat tab")
+    posts: list[Post] = Field(default_factory=list, description="recent posts mentioned in the summary")
+
+
+class ProfileExtractionError(RuntimeError):
+    pass
+
+
+def parse_profile(history):
+    # The agent's done action is constrained to TwitterProfile, so its final
+    # result is either a valid document or the run didn't finish
+    final = history.final_result()
+    if not history.is_done() or not final:
+        raise ProfileExtractionError("agent finished without returning a profile")
+    try:
+        return TwitterProfile.model_validate_json(final)
+    except ValueError as e:
+        raise ProfileExtractionError(f"agent returned an invalid profile: {e}") from e
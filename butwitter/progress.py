@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+
+from x_pages import ACCOUNT_SWITCHER, COMPOSE_TEXTAREA, GROK_PANEL, TOAST, grok_posts, profile_handle, visible_text
+
+logger = logging.getLogger(__name__)
+
+
+def json_lines_output():
+    # Keep a private handle on the real stdout for JSON-lines output and
+    # point fd 1 at stderr so library logging can't corrupt it
+    protocol = os.fdopen(os.dup(1), "w", buffering=1)
+    os.dup2(2, 1)
+
+    def send(message):
+        protocol.write(json.dumps(message) + "\n")
+        protocol.flush()
+
+    return send
+
+
+class ProgressReporter:
+    # Watches the page after each agent step and emits {"type": "progress", ...}
+    # events through `emit`. Each stage is reported once.
+
+    def __init__(self, emit=None):
+        self.emit = emit or (lambda event: None)
+        self.stages = set()
+
+    def stage(self, name, **data):
+        if name in self.stages:
+            return
+        self.stages.add(name)
+        self.emit({"type": "progress", "stage": name, **data})
+
+    async def on_step_end(self, agent):
+        # Progress is best effort, it must never fail the job
+        try:
+            page = await agent.browser_context.get_current_page()
+            if await page.locator(ACCOUNT_SWITCHER).count() > 0:
+                self.stage("logged_in")
+            await self.check(page)
+        except Exception as e:
+            logger.debug(f"Progress check failed: {e}")
+
+    async def check(self, page):
+        pass
+
+
+class ProfileProgress(ProgressReporter):
+    def __init__(self, username, emit=None):
+        super().__init__(emit)
+        self.username = username
+        self.summary = ""
+        self.sent_posts = set()
+
+    async def check(self, page):
+        handle = profile_handle(page.url)
+        if handle and handle.lower() == self.username.lower():
+            self.stage("on_profile", url=page.url)
+
+        # Grok streams the summary in, so forward it every time it grows
+        summary = await visible_text(page, GROK_PANEL)
+        if summary and summary != self.summary:
+            self.stage("summary_found")
+            self.summary = summary
+            self.emit({"type": "progress", "stage": "summary", "text": summary})
+            # The posts it links to show up as it streams
+            for post in await grok_posts(page):
+                if post["content"]:
+                    self.post(post)
+
+    def post(self, post):
+        # Forward a post once, the first time it is read
+        key = post["link"] or post["content"]
+        if key in self.sent_posts:
+            return
+        self.emit({"type": "progress", "stage": "post", "index": len(self.sent_posts), "post": post})
+        self.sent_posts.add(key)
+
+    def posts(self, profile):
+        # Whatever the final profile has that wasn't read off the page already
+        for post in profile.posts:
+            self.post(post.model_dump())
+
+
+class PostProgress(ProgressReporter):
+    async def check(self, page):
+        if await page.locator(COMPOSE_TEXTAREA).count() > 0:
+            self.stage("composing")
+        if "sent" in (await visible_text(page, TOAST)).lower():
+            self.stage("posted")
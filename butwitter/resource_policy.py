@@ -0,0 +1,201 @@
+import asyncio
+import json
+import logging
+import os
+from fnmatch import fnmatch
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# JSON file with the same shape as DEFAULT_POLICY to replace it
+RESOURCE_POLICY_PATH = os.getenv("RESOURCE_POLICY")
+BLOCK_RESOURCES = os.getenv("BLOCK_RESOURCES", "1") != "0"
+
+DEFAULT_POLICY = {
+    # playwright resource types nothing in the agent flows needs
+    "block_types": ["image", "media", "font"],
+    # Analytics and ad hosts, matched against the request host and its parents
+    "deny_hosts": [
+        "google-analytics.com",
+        "googletagmanager.com",
+        "googlesyndication.com",
+        "doubleclick.net",
+        "adservice.google.com",
+        "amazon-adsystem.com",
+        "ads-twitter.com",
+        "analytics.twitter.com",
+        "scorecardresearch.com",
+        "facebook.net",
+        "hotjar.com",
+        "quantserve.com",
+        "cookielaw.org",
+    ],
+    # Per-site overrides, keyed by the host of the page making the request.
+    # `allow` patterns win over everything; `deny` patterns add to the lists
+    # above; `block_types` replaces the default list for that site.
+    "sites": {
+        "x.com": {
+            "deny": ["*://video.twimg.com/*", "*://*.x.com/i/api/1.1/jot/*", "*://*.x.com/1.1/jot/*"],
+        },
+        "thingiverse.com": {
+            # Model thumbnails are how the agent picks a result
+            "block_types": ["media", "font"],
+            "deny": ["*://*.thingiverse.com/*ads*"],
+        },
+    },
+}
+
+
+# playwright resource types as the DevTools protocol names them
+_CDP_TYPES = {
+    "document": "Document", "stylesheet": "Stylesheet", "image": "Image", "media": "Media", "font": "Font",
+    "script": "Script", "xhr": "XHR", "fetch": "Fetch", "websocket": "WebSocket", "manifest": "Manifest",
+    "other": "Other",
+}
+
+
+def _host_matches(host, domain):
+    return host == domain or host.endswith("." + domain)
+
+
+class ResourcePolicy:
+    # Aborts requests the agents don't need (images, video, fonts, trackers)
+    # on a playwright browser context, with per-site allow/deny rules
+
+    def __init__(self, policy=DEFAULT_POLICY):
+        self.policy = policy
+        self.stats = {"allowed": 0, "blocked": 0, "blocked_by": {}}
+        self._installing = set()
+
+    def _site(self, page_url):
+        host = urlparse(page_url).hostname or ""
+        for site, rules in self.policy.get("sites", {}).items():
+            if _host_matches(host, site):
+                return rules
+        return {}
+
+    def blocked_by(self, url, resource_type, page_url=""):
+        # Why a request would be blocked ("type:image", "host:...", "deny:..."),
+        # or None when it goes through
+        site = self._site(page_url or url)
+        if any(fnmatch(url, pattern) for pattern in site.get("allow", [])):
+            return None
+        host = urlparse(url).hostname or ""
+        for domain in self.policy.get("deny_hosts", []):
+            if _host_matches(host, domain):
+                return f"host:{domain}"
+        for pattern in site.get("deny", []):
+            if fnmatch(url, pattern):
+                return f"deny:{pattern}"
+        if resource_type in site.get("block_types", self.policy.get("block_types", [])):
+            return f"type:{resource_type}"
+        return None
+
+    def _count(self, reason):
+        if reason:
+            self.stats["blocked"] += 1
+            self.stats["blocked_by"][reason] = self.stats["blocked_by"].get(reason, 0) + 1
+        else:
+            self.stats["allowed"] += 1
+
+    def cdp_patterns(self):
+        # Fetch.enable patterns for every request the policy could block on
+        # some site: the blockable resource types and the denied hosts and
+        # URLs. Nothing else is paused, so scripts and the page itself load
+        # straight from the HTTP cache.
+        sites = self.policy.get("sites", {}).values()
+        types = set(self.policy.get("block_types", []))
+        for rules in sites:
+            types.update(rules.get("block_types", []))
+        patterns = [
+            {"urlPattern": "*", "resourceType": _CDP_TYPES[t], "requestStage": "Request"}
+            for t in sorted(types) if t in _CDP_TYPES
+        ]
+        for domain in self.policy.get("deny_hosts", []):
+            patterns += [{"urlPattern": f"*://{domain}/*"}, {"urlPattern": f"*://*.{domain}/*"}]
+        for rules in sites:
+            patterns += [{"urlPattern": pattern} for pattern in rules.get("deny", [])]
+        return patterns
+
+    async def _install_page(self, playwright_context, page):
+        cdp = await playwright_context.new_cdp_session(page)
+
+        async def on_paused(event):
+            request = event["request"]
+            reason = self.blocked_by(request["url"], event.get("resourceType", "").lower(), page.url)
+            self._count(reason)
+            try:
+                if reason:
+                    await cdp.send("Fetch.failRequest", {"requestId": event["requestId"], "errorReason": "BlockedByClient"})
+                else:
+                    await cdp.send("Fetch.continueRequest", {"requestId": event["requestId"]})
+            except Exception as e:
+                # The page navigated or closed while the request was paused
+                logger.debug(f"Paused request went away: {e}")
+
+        cdp.on("Fetch.requestPaused", on_paused)
+        await cdp.send("Fetch.enable", {"patterns": self.cdp_patterns()})
+
+    async def _install_new_page(self, playwright_context, page):
+        try:
+            await self._install_page(playwright_context, page)
+        except Exception as e:
+            logger.warning(f"Couldn't install resource blocking on a new page: {e}")
+
+    def _on_page(self, playwright_context, page):
+        # Kept until done, or the task could be garbage collected mid-install
+        task = asyncio.create_task(self._install_new_page(playwright_context, page))
+        self._installing.add(task)
+        task.add_done_callback(self._installing.discard)
+
+    async def _route(self, route):
+        request = route.request
+        try:
+            page_url = request.frame.url
+        except Exception:
+            # Service worker requests have no frame
+            page_url = ""
+        reason = self.blocked_by(request.url, request.resource_type, page_url)
+        self._count(reason)
+        if reason:
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
+
+    async def install(self, playwright_context, use_cdp=True):
+        # Block through the DevTools protocol's Fetch domain, per page: unlike
+        # playwright's context.route(), it leaves the HTTP cache on, so warm
+        # pooled contexts don't refetch x.com's script bundles on every job
+        # (bench_resource_blocking.py --warm). Requests from out-of-process
+        # iframes aren't seen, and a popup's first requests may get through
+        # before its session is set up. Only Chromium speaks CDP; other
+        # browsers (and use_cdp=False) fall back to routing.
+        browser = playwright_context.browser
+        if not use_cdp or (browser is not None and browser.browser_type.name != "chromium"):
+            await playwright_context.route("**/*", self._route)
+            return
+        playwright_context.on("page", lambda page: self._on_page(playwright_context, page))
+        for page in playwright_context.pages:
+            await self._install_page(playwright_context, page)
+
+
+def load_policy(path=RESOURCE_POLICY_PATH):
+    if not path:
+        return ResourcePolicy()
+    try:
+        with open(path) as f:
+            return ResourcePolicy(json.load(f))
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable resource policy {path}, using the default: {e}")
+        return ResourcePolicy()
+
+
+async def block_resources(browser_context, policy=None):
+    # Install the policy on a browser_use BrowserContext; a no-op with
+    # BLOCK_RESOURCES=0
+    if not BLOCK_RESOURCES:
+        return None
+    policy = policy or load_policy()
+    session = await browser_context.get_session()
+    await policy.install(session.context)
+    return policy
@@ -0,0 +1,100 @@
+import os
+from contextlib import contextmanager
+
+import json_store
+
+RUN_METRICS_PATH = os.getenv(
+    "RUN_METRICS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".run_metrics.json"),
+)
+
+# Per-run counters from the page state filters (see page_state.py), and the
+# input tokens browser_use counted for the run's requests
+_STATE_COUNTERS = (
+    "input_tokens",
+    "state_tokens_raw", "state_tokens_sent",
+    "keyframes", "diff_steps", "state_tokens_undiffed", "state_tokens_diffed", "state_tokens_new",
+    "screenshots_sent", "screenshots_skipped", "screenshot_bytes_raw", "screenshot_bytes_sent",
+)
+
+
+class RunMetrics:
+    # Running totals per flow (agent steps, early exits, timings, model tiers), kept in one
+    # JSON file so they add up across processes and restarts; every change
+    # re-reads the file under a lock (see json_store.py)
+
+    def __init__(self, path=RUN_METRICS_PATH):
+        self.path = path
+        self.data = json_store.load(path, "run metrics")
+
+    @contextmanager
+    def _updating(self):
+        with json_store.locked(self.path, "run metrics") as data:
+            self.data = data
+            yield
+
+    def _flow(self, flow):
+        return self.data.setdefault(flow, {
+            "runs": 0, "steps": 0, "full_runs": 0, "full_run_steps": 0,
+            "early_exits": 0, "saved_steps": 0, "timings": {},
+            **{key: 0 for key in _STATE_COUNTERS},
+        })
+
+    def average_full_run_steps(self, flow):
+        totals = self._flow(flow)
+        return totals["full_run_steps"] / totals["full_runs"] if totals["full_runs"] else None
+
+    def record(self, flow, run):
+        # `run` is one run's profile: {"steps", "early_exit", "saved_steps",
+        # "timings": {name: seconds}, and the _STATE_COUNTERS}
+        with self._updating():
+            self._record(flow, run)
+
+    def _record(self, flow, run):
+        totals = self._flow(flow)
+        totals["runs"] += 1
+        totals["steps"] += run["steps"]
+        for key in _STATE_COUNTERS:
+            totals[key] = totals.get(key, 0) + run.get(key, 0)
+        if run.get("early_exit"):
+            totals["early_exits"] += 1
+            totals["saved_steps"] += run.get("saved_steps", 0)
+        else:
+            totals["full_runs"] += 1
+            totals["full_run_steps"] += run["steps"]
+        for name, seconds in run.get("timings", {}).items():
+            timing = totals["timings"].setdefault(name, {"count": 0, "seconds": 0.0})
+            timing["count"] += 1
+            timing["seconds"] += seconds
+
+    def record_tier(self, flow, model, ok, seconds, input_tokens, output_tokens, cost):
+        # One attempt of a flow on one model tier
+        with self._updating():
+            self._record_tier(flow, model, ok, seconds, input_tokens, output_tokens, cost)
+
+    def _record_tier(self, flow, model, ok, seconds, input_tokens, output_tokens, cost):
+        tiers = self._flow(flow).setdefault("tiers", {})
+        tier = tiers.setdefault(model, {
+            "attempts": 0, "successes": 0, "seconds": 0.0,
+            "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0,
+        })
+        tier["attempts"] += 1
+        tier["successes"] += 1 if ok else 0
+        tier["seconds"] += seconds
+        tier["input_tokens"] += input_tokens
+        tier["output_tokens"] += output_tokens
+        tier["cost_usd"] += cost
+
+    def summary(self, flow):
+        summary = dict(self._flow(flow))
+        summary["early_exit_rate"] = round(summary["early_exits"] / summary["runs"], 3) if summary["runs"] else None
+        summary["tiers"] = {
+            model: {
+                **tier,
+                "success_rate": round(tier["successes"] / tier["attempts"], 3),
+                "average_seconds": round(tier["seconds"] / tier["attempts"], 2),
+                "average_cost_usd": round(tier["cost_usd"] / tier["attempts"], 5),
+            }
+            for model, tier in summary.get("tiers", {}).items()
+        }
+        return summary
@@ -0,0 +1,146 @@
+import base64
+import io
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# Overrides the per-job default below for every job: "never", "on_failure",
+# "every:N" or "always"
+SCREENSHOT_POLICY = os.getenv("SCREENSHOT_POLICY")
+# Base64 characters a screenshot may take up in the prompt once re-encoded
+MAX_SCREENSHOT_BYTES = int(os.getenv("SCREENSHOT_MAX_BYTES", "120000"))
+MAX_SCREENSHOT_WIDTH = int(os.getenv("SCREENSHOT_MAX_WIDTH", "1024"))
+
+# Which steps send the model a screenshot, per job type. The x.com flows read
+# everything they need off the element list; a screenshot helps most right
+# after an action failed, when the page isn't what the model expected.
+DEFAULT_POLICY = {
+    "profile": "on_failure",
+    "post": "on_failure",
+    "login": "on_failure",
+    # Thingiverse results are picked by their thumbnails
+    "modelfinder": "every:2",
+}
+
+_warned_no_pillow = False
+
+_POLICY = re.compile(r"^(never|on_failure|always|every:([1-9]\d*))$")
+
+
+def parse_policy(policy):
+    # (mode, every) from a policy string; "always" is "every:1"
+    match = _POLICY.match(policy or "")
+    if not match:
+        raise ValueError(f"Unknown screenshot policy {policy!r}, expected never, on_failure, always or every:N")
+    if match.group(1) == "always":
+        return "every", 1
+    if match.group(2):
+        return "every", int(match.group(2))
+    return match.group(1), None
+
+
+def policy_for(job_type, policy=None):
+    # The policy for `job_type`: the one asked for, else SCREENSHOT_POLICY,
+    # else the job type's default
+    return policy or SCREENSHOT_POLICY or DEFAULT_POLICY.get(job_type, "on_failure")
+
+
+def _encode(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def shrink(screenshot, max_bytes=MAX_SCREENSHOT_BYTES, max_width=MAX_SCREENSHOT_WIDTH):
+    # Crop a base64 PNG screenshot to its content, scale it down to
+    # `max_width` and re-encode it until it fits in `max_bytes`. Stays a PNG,
+    # which is what browser_use labels it as. None when it can't be made to fit.
+    try:
+        from PIL import Image, ImageChops
+    except ImportError:
+        # Better an oversized screenshot than none where the policy wants one
+        global _warned_no_pillow
+        if not _warned_no_pillow:
+            logger.warning("Pillow isn't installed, sending screenshots without shrinking them")
+            _warned_no_pillow = True
+        return screenshot
+
+    image = Image.open(io.BytesIO(base64.b64decode(screenshot))).convert("RGB")
+    # Page background on both sides of x.com's centre column carries nothing
+    background = Image.new("RGB", image.size, image.getpixel((0, 0)))
+    bbox = ImageChops.difference(image, background).getbbox()
+    if bbox:
+        image = image.crop(bbox)
+    if image.width > max_width:
+        image = image.resize((max_width, round(image.height * max_width / image.width)), Image.LANCZOS)
+    encoded = _encode(image)
+    if len(encoded) > max_bytes:
+        # Page UIs have few colours, a palette loses little of what matters
+        image = image.quantize(colors=64)
+        encoded = _encode(image)
+    while len(encoded) > max_bytes and image.width > 256:
+        image = image.resize((image.width * 3 // 4, image.height * 3 // 4))
+        encoded = _encode(image)
+    return encoded if len(encoded) <= max_bytes else None
+
+
+def _failed(result):
+    return any(getattr(action_result, "error", None) for action_result in result or [])
+
+
+class ScreenshotPolicy:
+    # State filter that decides per step whether the model gets the
+    # screenshot, and shrinks the ones it does get
+
+    def __init__(self, policy="on_failure", max_bytes=MAX_SCREENSHOT_BYTES, max_width=MAX_SCREENSHOT_WIDTH):
+        self.mode, self.every = parse_policy(policy)
+        self.max_bytes = max_bytes
+        self.max_width = max_width
+        self.sent = 0
+        self.skipped = 0
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+        self.attach(None)
+
+    def attach(self, manager):
+        self.step = 0
+        self.last_failed = False
+
+    def on_result(self, result):
+        # The previous step's action results, before this step's state comes in
+        self.last_failed = _failed(result)
+
+    def wants_screenshot(self):
+        if self.mode == "never":
+            return False
+        if self.mode == "on_failure":
+            return self.last_failed
+        return (self.step - 1) % self.every == 0
+
+    def __call__(self, state):
+        self.step += 1
+        screenshot = getattr(state, "screenshot", None)
+        if not screenshot:
+            return
+        self.raw_bytes += len(screenshot)
+        if not self.wants_screenshot():
+            state.screenshot = None
+            self.skipped += 1
+            return
+        state.screenshot = shrink(screenshot, self.max_bytes, self.max_width)
+        if state.screenshot is None:
+            logger.info(f"Dropped a screenshot that didn't fit in {self.max_bytes} bytes")
+            self.skipped += 1
+            return
+        self.sent += 1
+        self.sent_bytes += len(state.screenshot)
+
+    def stats(self):
+        return {
+            "screenshots_sent": self.sent,
+            "screenshots_skipped": self.skipped,
+            "screenshot_bytes_raw": self.raw_bytes,
+            "screenshot_bytes_sent": self.sent_bytes,
+        }
@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import json_store
+from x_pages import element_role, page_type
+
+logger = logging.getLogger(__name__)
+
+SELECTOR_CACHE_PATH = os.getenv(
+    "SELECTOR_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".selector_cache.json"),
+)
+
+# Attributes x.com keeps stable across layout changes, best first
+_STABLE_ATTRIBUTES = ("data-testid", "aria-label", "placeholder", "name")
+
+
+def _css_for(element):
+    for name in _STABLE_ATTRIBUTES:
+        value = element.attributes.get(name)
+        if value:
+            return f"{element.tag_name}[{name}={json.dumps(value)}]"
+    return None
+
+
+class SelectorCache:
+    # Selectors for elements the LLM has located before, keyed by site, page
+    # type and element role. An entry is checked against the live page on
+    # every use and dropped as soon as it stops matching exactly one visible
+    # element. Every write re-reads the file under a lock (see json_store.py);
+    # lookups are counted in memory and written along with the next change,
+    # so they never write to disk on the agent's hot path.
+
+    def __init__(self, path=SELECTOR_CACHE_PATH):
+        self.path = path
+        self.unsaved = Counter()
+        self._use(json_store.load(path, "selector cache"))
+
+    def _use(self, data):
+        self.data = data
+        self.data.setdefault("selectors", {})
+        self.data.setdefault("stats", {"hits": 0, "misses": 0, "invalidations": 0, "learned": 0})
+
+    @contextmanager
+    def _updating(self):
+        with json_store.locked(self.path, "selector cache") as data:
+            self._use(data)
+            stats = self.data["stats"]
+            yield stats
+            for name, count in self.unsaved.items():
+                stats[name] += count
+        self.unsaved.clear()
+
+    @staticmethod
+    def key(url, role):
+        return f"{urlparse(url).hostname} {page_type(url)} {role}"
+
+    def learn(self, history):
+        # Store the elements a successful run interacted with that have a
+        # role, and write out the lookups counted since the last change
+        learned = {}
+        for entry in history.history:
+            if not entry.model_output or not entry.state.url:
+                continue
+            for element in entry.state.interacted_element or []:
+                if element is None:
+                    continue
+                role = element_role(element.tag_name, element.attributes)
+                if not role:
+                    continue
+                learned[self.key(entry.state.url, role)] = {
+                    "css": _css_for(element),
+                    "xpath": element.xpath,
+                    "learned_at": time.time(),
+                }
+        if learned or self.unsaved:
+            with self._updating() as stats:
+                self.data["selectors"].update(learned)
+                stats["learned"] += len(learned)
+        return len(learned)
+
+    async def locate(self, page, role):
+        # A locator for `role` on the current page, or None when it isn't
+        # cached or the cached selectors no longer match
+        key = self.key(page.url, role)
+        entry = self.data["selectors"].get(key)
+        if not entry:
+            self.unsaved["misses"] += 1
+            return None
+        candidates = [entry["css"]] if entry.get("css") else []
+        candidates.append("xpath=/" + entry["xpath"].lstrip("/"))
+        for selector in candidates:
+            locator = page.locator(selector)
+            try:
+                if await locator.count() == 1 and await locator.is_visible():
+                    self.unsaved["hits"] += 1
+                    return locator
+            except Exception as e:
+                logger.debug(f"Cached selector {selector} failed: {e}")
+        logger.info(f"Cached selector for {key} no longer matches, dropping it")
+        with self._updating() as stats:
+            # Another process may have learned a new selector for it meanwhile
+            if self.data["selectors"].get(key) == entry:
+                del self.data["selectors"][key]
+            stats["invalidations"] += 1
+            stats["misses"] += 1
+        return None
+
+    def stats(self):
+        stats = {name: count + self.unsaved[name] for name, count in self.data["stats"].items()}
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else None
+        stats["entries"] = len(self.data["selectors"])
+        return stats
+
+
+def register_actions(controller, selectors):
+    # Let the agent use a cached element with a local DOM query instead of
+    # reading the page to find it
+    from browser_use import ActionResult
+
+    roles = "search_bar, profile_summary, compose_box or post_button"
+
+    @controller.action(f"Click a known x.com element by role ({roles}) without searching the page for it")
+    async def click_known_element(role: str, browser):
+        page = await browser.get_current_page()
+        locator = await selectors.locate(page, role)
+        if locator is None:
+            return ActionResult(error=f"{role} is not known on this page, find it on the page instead")
+        await locator.click()
+        return ActionResult(extracted_content=f"Clicked {role}", include_in_memory=True)
+
+    @controller.action(f"Type text into a known x.com element by role ({roles}) without searching the page for it")
+    async def input_known_element(role: str, text: str, browser):
+        page = await browser.get_current_page()
+        locator = await selectors.locate(page, role)
+        if locator is None:
+            return ActionResult(error=f"{role} is not known on this page, find it on the page instead")
+        await locator.fill(text)
+        return ActionResult(extracted_content=f"Typed {text!r} into {role}", include_in_memory=True)
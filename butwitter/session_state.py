@@ -0,0 +1,124 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+from x_pages import ACCOUNT_SWITCHER
+
+logger = logging.getLogger(__name__)
+
+
+def storage_state_path():
+    # Read when used rather than at import, so .env (loaded after the entry
+    # points parse their arguments) can set it
+    return os.getenv(
+        "X_STORAGE_STATE",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), ".x_storage_state.json"),
+    )
+
+
+HOME_URL = "https://x.com/home"
+
+# x.com's session cookie; without it nothing else in the state is worth restoring
+AUTH_COOKIE = "auth_token"
+# Treat the session as expired a little early so it doesn't lapse mid-job
+EXPIRY_MARGIN_SECONDS = 300
+# How long x.com's client gets to render the side nav after the page loaded
+LOGGED_IN_TIMEOUT_MS = 10000
+
+_login_lock = asyncio.Lock()
+
+
+async def is_logged_in(page, timeout_ms=LOGGED_IN_TIMEOUT_MS):
+    # The account switcher in the side nav only renders for a logged in
+    # session, and only once the client has hydrated the page, some time
+    # after the load event
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+    try:
+        await page.locator(ACCOUNT_SWITCHER).first.wait_for(state="visible", timeout=timeout_ms)
+    except PlaywrightTimeoutError:
+        return False
+    return True
+
+
+def is_expired(state, now=None):
+    now = now or time.time()
+    for cookie in state.get("cookies", []):
+        if cookie.get("name") == AUTH_COOKIE:
+            expires = cookie.get("expires", -1)
+            # -1 is a session cookie, which playwright keeps until we drop the file
+            return expires != -1 and expires < now + EXPIRY_MARGIN_SECONDS
+    return True
+
+
+def load_state(path=None):
+    path = path or storage_state_path()
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable storage state {path}: {e}")
+        return None
+    if is_expired(state):
+        logger.info("Stored x.com session has expired")
+        return None
+    return state
+
+
+async def save_state(browser_context, path=None):
+    path = path or storage_state_path()
+    session = await browser_context.get_session()
+    state = await session.context.storage_state()
+    # Cookies are credentials: write privately and swap the file in atomically
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+    logger.info(f"Saved x.com storage state to {path}")
+
+
+async def restore_state(browser_context, state):
+    session = await browser_context.get_session()
+    if state.get("cookies"):
+        await session.context.add_cookies(state["cookies"])
+    for origin in state.get("origins", []):
+        items = {item["name"]: item["value"] for item in origin.get("localStorage", [])}
+        if not items:
+            continue
+        # localStorage can only be written from the page's own origin, so seed it
+        # before any of the site's scripts run on every navigation there
+        await session.context.add_init_script(
+            "(([origin, items]) => {"
+            " if (location.origin !== origin) return;"
+            " for (const [k, v] of Object.entries(items)) { if (localStorage.getItem(k) === null) localStorage.setItem(k, v); }"
+            f" }})({json.dumps([origin['origin'], items])})"
+        )
+
+
+async def ensure_logged_in(browser_context, login, path=None):
+    # Returns True when a stored session was reused, False after a fresh login
+    async with _login_lock:
+        state = load_state(path)
+        page = await browser_context.get_current_page()
+        if state:
+            await restore_state(browser_context, state)
+            await page.goto(HOME_URL)
+            await page.wait_for_load_state()
+            if await is_logged_in(page):
+                return True
+            logger.info("Stored x.com session was rejected, logging in again")
+
+        await login(browser_context)
+        page = await browser_context.get_current_page()
+        if page.url.rstrip("/") != HOME_URL:
+            await page.goto(HOME_URL)
+            await page.wait_for_load_state()
+        if not await is_logged_in(page):
+            raise RuntimeError("x.com login did not produce a logged in session")
+        await save_state(browser_context, path)
+        return False
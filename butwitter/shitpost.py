@@ -1,29 +1,185 @@
-from langchain_openai import ChatOpenAI
-from browser_use import Agent
-from dotenv import load_dotenv
+from progress import PostProgress, json_lines_output
+from session_state import ensure_logged_in, is_logged_in
+import argparse
 import asyncio
-import sys
+import os
 
-load_dotenv()
+# browser_use takes seconds to import, so it and everything built on it is
+# only loaded once a job actually runs (see check_importtime.py)
+_metrics = None
 
-llm = ChatOpenAI(model="gpt-4o")
 
+def get_metrics():
+    global _metrics
+    if _metrics is None:
+        from run_metrics import RunMetrics
 
-async def get_twitter_profile(text):
-    agent = Agent(
-        task=f"go on x.com, login with username <user> and password <password> post a tweet with the text {text}, click the post button.",
-        llm=llm,
+        _metrics = RunMetrics()
+    return _metrics
+
+
+def credentials():
+    # Read when used rather than at import, so .env can set them
+    return os.getenv("X_USERNAME", "<user>"), os.getenv("X_PASSWORD", "<password>")
+
+
+def login_task():
+    username, password = credentials()
+    return f"go on x.com, login with username {username} and password {password}"
+
+
+async def login(browser_context):
+    from browser_use import Agent
+    from macros import run_macro
+    from model_tiers import run_tiered
+
+    # The scripted login covers the usual form; the agent is only needed when
+    # x.com adds a step to it (unusual-activity or email checks)
+    try:
+        await run_macro("login", await browser_context.get_current_page(), *credentials())
+        return
+    except Exception:
+        pass
+
+    async def attempt(llm, max_steps):
+        agent = Agent(
+            task=login_task() + ", then stop once the home timeline is showing",
+            llm=llm,
+            browser_context=browser_context,
+        )
+        return await agent.run(max_steps=max_steps)
+
+    async def validate(history):
+        if not await is_logged_in(await browser_context.get_current_page()):
+            raise RuntimeError("login agent finished without a logged in session")
+        return history
+
+    await run_tiered("login", attempt, validate, metrics=get_metrics())
+
+
+_selectors = None
+
+
+def get_selectors():
+    global _selectors
+    if _selectors is None:
+        from selector_cache import SelectorCache
+
+        _selectors = SelectorCache()
+    return _selectors
+
+
+def clicked_post(history):
+    # Whether the agent clicked Post (or ran the macro that does) at any step
+    from x_pages import element_role
+
+    for entry in history.history:
+        if not entry.model_output:
+            continue
+        for i, action in enumerate(entry.model_output.action):
+            name, params = next(iter(action.model_dump(exclude_unset=True).items()))
+            element = entry.state.interacted_element[i] if i < len(entry.state.interacted_element) else None
+            if name == "compose_and_post":
+                return True
+            if name == "click_known_element" and params.get("role") == "post_button":
+                return True
+            if name == "click_element" and element is not None and element_role(element.tag_name, element.attributes) == "post_button":
+                return True
+            if name == "send_keys" and params.get("keys", "").endswith("+Enter"):
+                return True
+    return False
+
+
+async def get_twitter_profile(text, browser_context=None, emit=None, screenshots=None):
+    from browser_use import Agent, Controller
+    from macros import register_macros
+    from model_tiers import DontEscalate, run_tiered
+    from page_state import install_state_filters, state_filters
+    from selector_cache import register_actions
+
+    progress = PostProgress(emit)
+    if browser_context:
+        progress.stage("logged_in")
+        task = f"you are already logged in on x.com, post a tweet with the text {text}, click the post button."
+    else:
+        task = f"{login_task()} post a tweet with the text {text}, click the post button."
+    controller = Controller()
+    register_actions(controller, get_selectors())
+    hint = register_macros(
+        controller,
+        ["login_to_x", "compose_and_post"],
+        get_selectors(),
+        credentials=None if browser_context else credentials(),
+        emit=progress.emit,
     )
-    result = await agent.run()
+    filters = state_filters("post", screenshots)
+
+    async def attempt(llm, max_steps):
+        agent = Agent(
+            task=task + hint,
+            llm=llm,
+            browser_context=browser_context,
+            controller=controller,
+        )
+        install_state_filters(agent, *filters)
+        return await agent.run(max_steps=max_steps, on_step_end=progress.on_step_end)
+
+    async def validate(history):
+        # Once x.com has confirmed the post it must not be escalated, or the
+        # next tier would post it again
+        if "posted" in progress.stages or history.is_done():
+            return history
+        # The "sent" toast is gone within seconds, so a missed one doesn't
+        # mean the tweet wasn't posted
+        if clicked_post(history):
+            raise DontEscalate("post agent clicked Post but didn't confirm the tweet, not retrying")
+        raise RuntimeError("post agent stopped before the tweet was posted")
+
+    result, _ = await run_tiered("post", attempt, validate, metrics=get_metrics(), emit=progress.emit)
+    run = {"steps": len(result.history), "input_tokens": result.total_input_tokens()}
+    for state_filter in filters:
+        run.update(state_filter.stats())
+    get_metrics().record("post", run)
+    get_selectors().learn(result)
     return result
 
 
-async def main():
-    # Get username from command line arguments or use default
-    text = sys.argv[1] if len(sys.argv) > 1 else "elonmusk"
-    result = await get_twitter_profile(text)
-    print(result)
+def parse_args():
+    parser = argparse.ArgumentParser(description="Post a tweet with a browser agent")
+    # Get the tweet text from command line arguments or use default
+    parser.add_argument("text", nargs="?", default="elonmusk")
+    parser.add_argument("--progress", action="store_true",
+                        help="write NDJSON progress events, then the result, to stdout")
+    parser.add_argument("--screenshots", metavar="POLICY",
+                        help="when the model gets a screenshot: never, on_failure, always or every:N "
+                             "(default: SCREENSHOT_POLICY, else on_failure)")
+    return parser.parse_args()
+
+
+async def main(args):
+    from browser_use import Browser
+    from resource_policy import block_resources
+
+    send = json_lines_output() if args.progress else None
+    browser = Browser()
+    try:
+        browser_context = await browser.new_context()
+        await block_resources(browser_context)
+        # Reuse the saved x.com session when it is still valid, log in only when it isn't
+        await ensure_logged_in(browser_context, login)
+        result = await get_twitter_profile(args.text, browser_context, emit=send, screenshots=args.screenshots)
+    finally:
+        await browser.close()
+    if send:
+        send({"type": "result", "result": str(result.final_result() or result)})
+    else:
+        print(result)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # Before parse_args, whose defaults come from the environment too
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    args = parse_args()
+    asyncio.run(main(args))
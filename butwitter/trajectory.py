@@ -0,0 +1,276 @@
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+import json_store
+from macros import MACRO_ACTIONS, run_macro
+from x_pages import RESERVED_PATHS, element_role
+
+logger = logging.getLogger(__name__)
+
+TRAJECTORY_PATH = os.getenv(
+    "TRAJECTORY_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".trajectories.json"),
+)
+STEP_TIMEOUT_MS = 8000
+
+# browser_use actions we know how to repeat without the LLM; anything else
+# (extract_content, done, ...) needs the model and ends the recording.
+# Posting is never replayed, whatever ends up in a history.
+_REPLAYABLE = {
+    "go_to_url", "click_element", "input_text", "send_keys", "scroll_down", "scroll_up", "wait",
+    "click_known_element", "input_known_element", *(set(MACRO_ACTIONS) - {"compose_and_post"}),
+}
+
+
+# Job values shorter than this, or that are also words in x.com's own URLs,
+# would be swapped for placeholders where they aren't the job value at all
+MIN_VARIABLE_CHARS = 4
+_URL_WORDS = RESERVED_PATHS | {
+    "status", "photo", "with_replies", "media", "likes", "highlights", "articles", "hashtag",
+    "lists", "bookmarks", "followers", "following", "verified_followers", "https", "http", "www",
+}
+
+
+def templatable(variables, urls):
+    # Whether a run for these job values can be recorded: every value must be
+    # long enough, not an x.com path word and not part of a host the run visited
+    hosts = [(urlsplit(url).hostname or "").lower() for url in urls if url]
+    for concrete in variables.values():
+        value = (concrete or "").lower()
+        if len(value) < MIN_VARIABLE_CHARS or value in _URL_WORDS or any(value in host for host in hosts):
+            return False
+    return True
+
+
+def _templatize(value, variables):
+    # Swap a value that is exactly a job value (the username) for its {name}
+    # placeholder; anything else is kept as recorded
+    for name, concrete in variables.items():
+        if concrete and value.strip().lower() == concrete.lower():
+            return "{" + name + "}"
+    return value
+
+
+def _templatize_part(part, variables):
+    # A URL path segment or query value, templatized when it decodes to a job value
+    templatized = _templatize(unquote_plus(part), variables)
+    return templatized if templatized != unquote_plus(part) else part
+
+
+def _templatize_url(url, variables):
+    # _templatize for each path segment and query value of `url`; the host
+    # and everything else stay as recorded
+    parts = urlsplit(url)
+    path = "/".join(_templatize_part(segment, variables) for segment in parts.path.split("/"))
+    query = []
+    for pair in parts.query.split("&") if parts.query else []:
+        key, equals, value = pair.partition("=")
+        query.append(key + equals + _templatize_part(value, variables))
+    return urlunsplit((parts.scheme, parts.netloc, path, "&".join(query), parts.fragment))
+
+
+def _fill(template, variables):
+    for name, concrete in variables.items():
+        template = template.replace("{" + name + "}", concrete)
+    return template
+
+
+def _url_pattern(template, variables):
+    pattern = re.escape(template)
+    for name, concrete in variables.items():
+        pattern = pattern.replace(re.escape("{" + name + "}"), re.escape(concrete))
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def _describe(step):
+    if step["action"] == "go_to_url":
+        return f"opened {step['url']}"
+    if step["action"] in ("input_text", "input_known_element"):
+        return f"typed \"{step['text']}\" into {step.get('label') or step.get('role') or step['tag']}"
+    if step["action"] in ("click_element", "click_known_element"):
+        return f"clicked {step.get('label') or step.get('role') or step['tag']}"
+    if step["action"] in MACRO_ACTIONS:
+        return " ".join([step["action"].replace("_", " "), *step["args"]])
+    if step["action"] == "send_keys":
+        return f"pressed {step['keys']}"
+    return step["action"].replace("_", " ")
+
+
+def steps_from_history(history, variables):
+    # Turn a successful browser_use run into concrete, replayable steps
+    steps = []
+    entries = history.history
+    for position, entry in enumerate(entries):
+        if not entry.model_output:
+            continue
+        # The page a step leads to is the state captured at the start of the next one
+        next_url = entries[position + 1].state.url if position + 1 < len(entries) else None
+        actions = entry.model_output.action
+        for i, action in enumerate(actions):
+            name, params = next(iter(action.model_dump(exclude_unset=True).items()))
+            if name not in _REPLAYABLE:
+                return steps
+            step = {"action": name}
+            element = entry.state.interacted_element[i] if i < len(entry.state.interacted_element) else None
+            if name in ("click_element", "input_text"):
+                if element is None:
+                    return steps
+                step["xpath"] = element.xpath
+                step["tag"] = element.tag_name
+                step["label"] = element.attributes.get("aria-label") or element.attributes.get("placeholder") or ""
+                step["role"] = element_role(element.tag_name, element.attributes)
+                if step["role"] == "post_button":
+                    return steps
+            if name in ("click_known_element", "input_known_element"):
+                step["role"] = params["role"]
+            if name in MACRO_ACTIONS:
+                # login_to_x takes no arguments: the credentials are never recorded
+                step["args"] = [_templatize(str(value), variables) for value in params.values()]
+            if name == "go_to_url":
+                step["url"] = _templatize_url(params["url"], variables)
+            if name in ("input_text", "input_known_element"):
+                step["text"] = _templatize(params["text"], variables)
+            if name == "send_keys":
+                step["keys"] = params["keys"]
+            if name in ("scroll_down", "scroll_up"):
+                step["amount"] = params.get("amount")
+            if name == "wait":
+                step["seconds"] = params.get("seconds", 3)
+            if next_url and i == len(actions) - 1:
+                step["expect_url"] = _templatize_url(next_url, variables)
+            steps.append(step)
+    return steps
+
+
+def step_seconds(history):
+    # Mean wall time of an LLM-driven step, used to estimate what replay saves
+    durations = [entry.metadata.duration_seconds for entry in history.history if entry.metadata]
+    return sum(durations) / len(durations) if durations else 0.0
+
+
+class ReplayResult:
+    def __init__(self, replayed, total, seconds, reason=None):
+        self.replayed = replayed
+        self.total = total
+        self.seconds = seconds
+        self.reason = reason
+
+    @property
+    def complete(self):
+        return self.total > 0 and self.replayed == self.total
+
+
+class TrajectoryStore:
+    # Recorded step lists per flow plus replay statistics, kept in one JSON file
+    # that every change re-reads under a lock (see json_store.py)
+
+    def __init__(self, path=TRAJECTORY_PATH):
+        self.path = path
+        self.data = json_store.load(path, "trajectory file")
+
+    @contextmanager
+    def _updating(self):
+        with json_store.locked(self.path, "trajectory file") as data:
+            self.data = data
+            yield
+
+    def _flow(self, flow):
+        return self.data.setdefault(flow, {
+            "steps": [],
+            "stats": {"replays": 0, "complete": 0, "diverged": 0, "replayed_steps": 0,
+                      "replay_seconds": 0.0, "saved_seconds": 0.0, "llm_step_seconds": 0.0},
+        })
+
+    def steps(self, flow):
+        return self._flow(flow)["steps"]
+
+    def stats(self, flow):
+        stats = dict(self._flow(flow)["stats"])
+        stats["success_rate"] = round(stats["complete"] / stats["replays"], 3) if stats["replays"] else None
+        return stats
+
+    def record(self, flow, steps, llm_step_seconds):
+        with self._updating():
+            entry = self._flow(flow)
+            entry["steps"] = steps
+            entry["recorded_at"] = time.time()
+            if llm_step_seconds:
+                entry["stats"]["llm_step_seconds"] = llm_step_seconds
+
+    def note_replay(self, flow, result):
+        with self._updating():
+            stats = self._flow(flow)["stats"]
+            stats["replays"] += 1
+            stats["complete" if result.complete else "diverged"] += 1
+            stats["replayed_steps"] += result.replayed
+            stats["replay_seconds"] += result.seconds
+            stats["saved_seconds"] += max(0.0, result.replayed * stats["llm_step_seconds"] - result.seconds)
+
+
+async def _locate(page, step, selectors):
+    # Prefer the selector cache's validated selector for the element's role,
+    # then the xpath recorded with the step
+    if selectors and step.get("role"):
+        locator = await selectors.locate(page, step["role"])
+        if locator is not None:
+            return locator
+    if not step.get("xpath"):
+        raise LookupError(f"no selector for {step.get('role')}")
+    # browser_use records xpaths relative to the document ("html/body/...")
+    locator = page.locator("xpath=/" + step["xpath"].lstrip("/")).first
+    await locator.wait_for(state="visible", timeout=STEP_TIMEOUT_MS)
+    return locator
+
+
+async def _perform(page, step, variables, selectors=None, credentials=None):
+    action = step["action"]
+    if action == "login_to_x":
+        if not credentials:
+            raise RuntimeError("no credentials to log in with")
+        await run_macro("login", page, *credentials, selectors=selectors)
+    elif action in MACRO_ACTIONS:
+        args = (_fill(arg, variables) for arg in step["args"])
+        await run_macro(MACRO_ACTIONS[action], page, *args, selectors=selectors)
+    elif action == "go_to_url":
+        await page.goto(_fill(step["url"], variables))
+        await page.wait_for_load_state()
+    elif action in ("click_element", "click_known_element"):
+        locator = await _locate(page, step, selectors)
+        await locator.click(timeout=STEP_TIMEOUT_MS)
+    elif action in ("input_text", "input_known_element"):
+        locator = await _locate(page, step, selectors)
+        await locator.fill(_fill(step["text"], variables), timeout=STEP_TIMEOUT_MS)
+    elif action == "send_keys":
+        await page.keyboard.press(step["keys"])
+    elif action in ("scroll_down", "scroll_up"):
+        amount = step.get("amount") or await page.evaluate("window.innerHeight")
+        await page.mouse.wheel(0, amount if action == "scroll_down" else -amount)
+    elif action == "wait":
+        await page.wait_for_timeout(step["seconds"] * 1000)
+
+    if step.get("expect_url"):
+        await page.wait_for_url(_url_pattern(step["expect_url"], variables), timeout=STEP_TIMEOUT_MS)
+
+
+async def replay(browser_context, steps, variables, selectors=None, credentials=None):
+    # Repeat recorded steps without the LLM, stopping at the first one whose
+    # element is missing or that doesn't lead where it did when recorded.
+    # `credentials` (username, password) are for replaying login_to_x.
+    started = time.monotonic()
+    page = await browser_context.get_current_page()
+    for index, step in enumerate(steps):
+        try:
+            await _perform(page, step, variables, selectors, credentials)
+        except Exception as e:
+            logger.info(f"Replay diverged at step {index + 1}/{len(steps)} ({_describe(step)}): {e}")
+            return ReplayResult(index, len(steps), time.monotonic() - started, reason=str(e))
+    return ReplayResult(len(steps), len(steps), time.monotonic() - started)
+
+
+def completed_summary(steps, variables):
+    # What replay already did, phrased for the fallback agent's task
+    return "; ".join(_fill(_describe(step), variables) for step in steps)
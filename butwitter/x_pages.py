@@ -0,0 +1,178 @@
+import os
+import re
+from urllib.parse import urlparse
+
+# Selectors for the parts of x.com the agents care about, kept in one place
+# because x.com renames them from time to time
+ACCOUNT_SWITCHER = '[data-testid="SideNav_AccountSwitcher_Button"]'
+GROK_PANEL = '[data-testid="GrokDrawer"]'
+COMPOSE_TEXTAREA = '[data-testid="tweetTextarea_0"]'
+TOAST = '[data-testid="toast"]'
+PROFILE_USER_NAME = '[data-testid="UserName"]'
+# "This account doesn't exist" and suspended-account pages
+EMPTY_STATE = '[data-testid="emptyState"]'
+# The Grok button beside the three dots on a profile, and its label; every
+# post has a "Grok actions" button too, which is not it
+PROFILE_SUMMARY_LABEL = "profile summary"
+PROFILE_SUMMARY_BUTTON = 'button[aria-label*="profile summary" i], [data-testid="primaryColumn"] button[aria-label*="Grok" i]'
+SEARCH_USER_CELL = '[data-testid="UserCell"]'
+POST_BUTTON = '[data-testid="tweetButton"]'
+LOGIN_URL = "https://x.com/i/flow/login"
+LOGIN_USERNAME_INPUT = 'input[autocomplete="username"]'
+LOGIN_PASSWORD_INPUT = 'input[name="password"]'
+LOGIN_BUTTON = '[data-testid="LoginForm_Login_Button"]'
+
+RESERVED_PATHS = {"home", "explore", "search", "notifications", "messages", "i", "compose", "settings", "login"}
+
+
+def profile_handle(url):
+    # The handle when `url` is a profile page (x.com/<handle>), otherwise None
+    parsed = urlparse(url)
+    if parsed.hostname not in ("x.com", "twitter.com", "www.x.com", "www.twitter.com"):
+        return None
+    match = re.fullmatch(r"/([A-Za-z0-9_]{1,15})/?", parsed.path)
+    if not match or match.group(1).lower() in RESERVED_PATHS:
+        return None
+    return match.group(1)
+
+
+def is_handle(text):
+    # Whether `text` can be an x.com handle as-is, so x.com/<text> is its profile
+    return bool(re.fullmatch(r"[A-Za-z0-9_]{1,15}", text)) and text.lower() not in RESERVED_PATHS
+
+
+async def open_profile(page, handle, timeout_ms=8000):
+    # Go straight to x.com/<handle>. True when that lands on the profile of
+    # exactly that handle, False on a 404, an empty/suspended account page or
+    # a redirect somewhere else.
+    response = await page.goto(f"https://x.com/{handle}")
+    if response is not None and response.status == 404:
+        return False
+    try:
+        await page.locator(f"{PROFILE_USER_NAME}, {EMPTY_STATE}").first.wait_for(timeout=timeout_ms)
+    except Exception:
+        return False
+    landed = profile_handle(page.url)
+    if not landed or landed.lower() != handle.lower() or await page.locator(EMPTY_STATE).count() > 0:
+        return False
+    return f"@{handle.lower()}" in (await visible_text(page, PROFILE_USER_NAME)).lower()
+
+
+async def visible_text(page, selector):
+    locator = page.locator(selector)
+    if await locator.count() == 0:
+        return ""
+    return (await locator.first.inner_text()).strip()
+
+
+def page_type(url):
+    # Coarse kind of x.com page, part of the selector cache key
+    parsed = urlparse(url)
+    path = parsed.path.rstrip("/")
+    if path == "/home":
+        return "home"
+    if path in ("/search", "/explore") or path.startswith("/explore/"):
+        return "search"
+    if path.startswith("/compose"):
+        return "compose"
+    if path.startswith("/i/flow/login") or path == "/login":
+        return "login"
+    if profile_handle(url):
+        return "profile"
+    return "other"
+
+
+def element_role(tag, attributes):
+    # The role of an element the agent interacted with, when it is one the
+    # agents look for on every run
+    testid = attributes.get("data-testid", "")
+    label = (attributes.get("aria-label") or attributes.get("placeholder") or "").lower()
+    if testid == "SearchBox_Search_Input" or (tag == "input" and "search" in label):
+        return "search_bar"
+    if label == PROFILE_SUMMARY_LABEL:
+        return "profile_summary"
+    if testid == "tweetTextarea_0":
+        return "compose_box"
+    if testid in ("tweetButton", "tweetButtonInline"):
+        return "post_button"
+    return None
+
+
+async def grok_posts(page):
+    # Posts the Grok summary links to, as {date, content, link}; date and
+    # content come from the text around each link
+    return await page.evaluate(
+        """(selector) => {
+            const panel = document.querySelector(selector);
+            if (!panel) return [];
+            const seen = new Set();
+            return [...panel.querySelectorAll('a[href*="/status/"]')].flatMap((a) => {
+                const link = new URL(a.getAttribute('href'), location.origin).href;
+                if (seen.has(link)) return [];
+                seen.add(link);
+                const block = a.closest('li, p, div') || a;
+                const time = block.querySelector('time');
+                return [{
+                    date: time ? time.getAttribute('datetime') || time.textContent.trim() : '',
+                    content: block.textContent.trim(),
+                    link,
+                }];
+            });
+        }""",
+        GROK_PANEL,
+    )
+
+
+async def wait_for_quiet(page, selector, quiet_ms=None, timeout_ms=None):
+    # Wait, inside the page, for `selector` to appear and then go `quiet_ms`
+    # without a DOM mutation. A MutationObserver drives it, so there is no
+    # polling from here. Returns {seconds, mutations, timed_out}.
+    # GROK_QUIET_MS / GROK_TIMEOUT_MS set how long the panel must go without
+    # DOM changes to count as finished, and how long to wait at most
+    quiet_ms = quiet_ms or int(os.getenv("GROK_QUIET_MS", "1500"))
+    timeout_ms = timeout_ms or int(os.getenv("GROK_TIMEOUT_MS", "45000"))
+    result = await page.evaluate(
+        """([selector, quietMs, timeoutMs]) => new Promise((resolve) => {
+            const started = performance.now();
+            let mutations = 0;
+            let observer = null;
+            let quietTimer = null;
+            let done = false;
+            const finish = (timedOut) => {
+                if (done) return;
+                done = true;
+                if (observer) observer.disconnect();
+                clearTimeout(quietTimer);
+                clearTimeout(deadline);
+                resolve({ seconds: (performance.now() - started) / 1000, mutations, timedOut });
+            };
+            const deadline = setTimeout(() => finish(true), timeoutMs);
+            const settle = () => {
+                clearTimeout(quietTimer);
+                quietTimer = setTimeout(() => finish(false), quietMs);
+            };
+            const watch = (element) => {
+                observer = new MutationObserver((records) => {
+                    mutations += records.length;
+                    settle();
+                });
+                observer.observe(element, { childList: true, subtree: true, characterData: true, attributes: true });
+                settle();
+            };
+            const element = document.querySelector(selector);
+            if (element) {
+                watch(element);
+                return;
+            }
+            observer = new MutationObserver(() => {
+                const found = document.querySelector(selector);
+                if (found) {
+                    observer.disconnect();
+                    watch(found);
+                }
+            });
+            observer.observe(document.body, { childList: true, subtree: true });
+        })""",
+        [selector, quiet_ms, timeout_ms],
+    )
+    return {"seconds": result["seconds"], "mutations": result["mutations"], "timed_out": result["timedOut"]}
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+
+logger = logging.getLogger(__name__)
+
+# How long a client gets to send its job after connecting
+JOB_READ_TIMEOUT = 10
+
+_children = set()
+
+
+def _reap(*_):
+    while _children:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            _children.clear()
+            return
+        if pid == 0:
+            return
+        _children.discard(pid)
+
+
+def _wait_for_slot(max_children):
+    # Sleep until fewer than `max_children` jobs run. SIGCHLD stays blocked
+    # meanwhile, so a child exiting between the check and the wait still
+    # wakes us.
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGCHLD})
+    try:
+        _reap()
+        while len(_children) >= max_children:
+            signal.sigwait({signal.SIGCHLD})
+            _reap()
+    finally:
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGCHLD})
+
+
+def _read_job(conn):
+    buffer = b""
+    while b"\n" not in buffer:
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        buffer += chunk
+    return json.loads(buffer.split(b"\n", 1)[0])
+
+
+def _run_child(conn, handle_job):
+    # Read in the child, so a client that connects and sends nothing only
+    # holds up its own job
+    conn.settimeout(JOB_READ_TIMEOUT)
+    try:
+        job = _read_job(conn)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Dropping connection with unreadable job: {e}")
+        return
+    conn.settimeout(None)
+
+    def send(message):
+        conn.sendall((json.dumps(message) + "\n").encode())
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+
+        # The client hanging up means nobody wants the result any more
+        def on_readable():
+            try:
+                if not conn.recv(1024):
+                    task.cancel()
+            except OSError:
+                task.cancel()
+        loop.add_reader(conn.fileno(), on_readable)
+        try:
+            await handle_job(job, send)
+        finally:
+            loop.remove_reader(conn.fileno())
+
+    send({"id": job.get("id"), "type": "started", "pid": os.getpid()})
+    try:
+        asyncio.run(run())
+    except asyncio.CancelledError:
+        pass
+    except BrokenPipeError:
+        pass
+
+
+def serve(socket_path, handle_job, max_children=4, on_ready=None):
+    # Everything imported before this point lives in the parent once and is
+    # shared copy-on-write with each forked job, so children skip import and
+    # client setup entirely and start running the job straight away.
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    server.listen(64)
+    signal.signal(signal.SIGCHLD, _reap)
+    logger.info(f"Zygote listening on {socket_path} (pid {os.getpid()})")
+    if on_ready:
+        on_ready()
+
+    try:
+        while True:
+            _wait_for_slot(max_children)
+            conn, _ = server.accept()
+            pid = os.fork()
+            if pid == 0:
+                exit_code = 0
+                try:
+                    server.close()
+                    # asyncio's subprocess support (used to launch the browser)
+                    # needs to reap its own children
+                    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                    _run_child(conn, handle_job)
+                except BaseException:
+                    logger.exception("Zygote child failed")
+                    exit_code = 1
+                finally:
+                    conn.close()
+                    os._exit(exit_code)
+
+            _children.add(pid)
+            conn.close()
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
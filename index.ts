@@ -1,8 +1,8 @@
 import { TpaServer, TpaSession } from '@augmentos/sdk';
-import { TwitterAgent } from './twitterAgent';
-import path from 'path';
-import fs from 'fs';
-import { spawn } from 'child_process';
+import { TwitterAgent, TwitterProfile, getLookupStats } from './twitterAgent';
+
+// Where a speculative lookup got to by the time the user answered
+type SpeculationOutcome = 'running' | 'found' | 'failed';
 
 class TwitterGlassesApp extends TpaServer {
   // Track state
@@ -21,6 +21,16 @@ class TwitterGlassesApp extends TpaServer {
   // Add a new property to track the confirmation timeout
   private confirmationTimeout: NodeJS.Timeout | null = null;
 
+  // Username of the profile being read, so background refreshes don't
+  // overwrite a different lookup
+  private displayedProfileUsername: string | null = null;
+
+  // Speculative prefetch: start the lookup for pendingUsername while we wait
+  // for the user to confirm it (TWITTER_SPECULATIVE_PREFETCH=1 to enable)
+  private speculativePrefetch: boolean = process.env.TWITTER_SPECULATIVE_PREFETCH === '1';
+  private speculativeLookup: { username: string; controller: AbortController; outcome: SpeculationOutcome } | null = null;
+  private speculationStats = { started: 0, hits: 0, wasted: 0 };
+
   protected async onSession(session: TpaSession, sessionId: string, userId: string): Promise<void> {
     // Show welcome message
     session.layouts.showTextWall("Twitter Glasses App Ready!");
@@ -62,12 +72,14 @@ class TwitterGlassesApp extends TpaServer {
                 console.log(`[DEBUG] About to fetch profile for: "${username}"`);
                 session.layouts.showTextWall(`Getting Twitter info for: ${username}...`);
                 this.fetchTwitterProfile(session, twitterAgent, username);
+                this.claimSpeculativeLookup(twitterAgent, username);
               }
             } else if (text.includes('no') || text.includes('wrong') || text.includes('incorrect') || text.includes('cancel')) {
               console.log("Confirmation received: NO");
               // User rejected the username
               this.isAwaitingConfirmation = false;
               this.pendingUsername = null;
+              this.cancelSpeculativeLookup();
               
               // Clear the timeout
               if (this.confirmationTimeout) {
@@ -81,6 +93,7 @@ class TwitterGlassesApp extends TpaServer {
               const newUsername = text.replace(/twitter profile|get twitter info/gi, "").trim();
               if (newUsername) {
                 this.pendingUsername = newUsername;
+                this.startSpeculativeLookup(twitterAgent, newUsername);
                 session.layouts.showTextWall(`Changed username. Did you want to look up "${newUsername}"? Please say yes or no.`);
               } else {
                 session.layouts.showTextWall(`Did you want to look up "${this.pendingUsername}"? Please say yes or no.`);
@@ -90,6 +103,7 @@ class TwitterGlassesApp extends TpaServer {
                 console.log("Confirmation manually cancelled");
                 this.isAwaitingConfirmation = false;
                 this.pendingUsername = null;
+                this.cancelSpeculativeLookup();
                 
                 if (this.confirmationTimeout) {
                   clearTimeout(this.confirmationTimeout);
@@ -141,7 +155,9 @@ class TwitterGlassesApp extends TpaServer {
               pendingUsername: this.pendingUsername,
               chunksCount: this.twitterChunks.length,
               currentChunk: this.currentChunkIndex,
-              isAutoAdvancing: this.isAutoAdvancing
+              isAutoAdvancing: this.isAutoAdvancing,
+              lookups: getLookupStats(),
+              speculation: this.speculationStats
             };
             
             session.layouts.showTextWall(`App State: ${JSON.stringify(state, null, 2)}`, {
@@ -290,6 +306,7 @@ class TwitterGlassesApp extends TpaServer {
       // Add cleanup for timers when session ends
       () => {
         this.stopAutoAdvance();
+        this.cancelSpeculativeLookup();
       }
     ];
 
@@ -328,45 +345,33 @@ class TwitterGlassesApp extends TpaServer {
   private fetchTwitterProfile(session: TpaSession, twitterAgent: TwitterAgent, username: string): void {
     console.log(`[DEBUG] fetchTwitterProfile called with username: "${username}"`);
     
-    // Show loading message
-    session.layouts.showTextWall(`Fetching Twitter profile for ${username}...`);
-    
     // Set flag to indicate we're displaying Twitter info
     this.isDisplayingTwitterInfo = true;
+    this.displayedProfileUsername = username;
+    
+    // Stale-while-revalidate: show whatever we have cached right away, even if it
+    // is past its freshness window, and only wait on the agent for unseen handles
+    const cached = twitterAgent.getCachedProfile(username);
+    if (cached) {
+      console.log(`[DEBUG] Showing ${cached.stale ? 'stale' : 'fresh'} cached profile for ${username}`);
+      const ageMinutes = Math.round(cached.ageSeconds / 60);
+      this.displayProfile(session, cached.profile, cached.stale ? `(cached ${ageMinutes} min ago, refreshing...)` : undefined);
+      
+      if (cached.stale) {
+        this.revalidateProfile(session, twitterAgent, username, cached.profile);
+      }
+      return;
+    }
+    
+    // Show loading message
+    session.layouts.showTextWall(`Fetching Twitter profile for ${username}...`);
     
     twitterAgent.getProfileInfo(username)
       .then(profileInfo => {
         console.log(`[DEBUG] Profile info received:`, profileInfo ? "success" : "null");
         
         if (profileInfo) {
-          // Format the profile information
-          let profileText = `Twitter Profile: @${profileInfo.username}\n\n`;
-          profileText += `${profileInfo.description}\n\n`;
-          
-          // Add posts
-          if (profileInfo.posts && profileInfo.posts.length > 0) {
-            profileText += "Recent Posts:\n\n";
-            
-            profileInfo.posts.forEach(post => {
-              profileText += `${post.date}\n${post.content}\n\n`;
-            });
-          } else {
-            profileText += "No recent posts found.";
-          }
-          
-          console.log("[DEBUG] Formatted profile text:", profileText);
-          
-          // Chunk the text for better readability
-          this.twitterChunks = this.chunkText(profileText, 500, 200);
-          this.currentChunkIndex = 0;
-          
-          console.log(`[DEBUG] Chunked Twitter profile into ${this.twitterChunks.length} parts`);
-          
-          // Display the first chunk immediately
-          this.displayTwitterChunk(session);
-          
-          // Start auto-advancing through the chunks
-          this.startAutoAdvance(session);
+          this.displayProfile(session, profileInfo);
         } else {
           // Handle case where no profile was found
           session.layouts.showTextWall(`Could not find Twitter profile for ${username}.`);
@@ -380,6 +385,63 @@ class TwitterGlassesApp extends TpaServer {
       });
   }
   
+  /**
+   * Refresh a stale cached profile in the background and swap it onto the
+   * display only if its content changed and the user is still reading it
+   */
+  private revalidateProfile(session: TpaSession, twitterAgent: TwitterAgent, username: string, staleProfile: TwitterProfile): void {
+    twitterAgent.refreshProfile(username)
+      .then(freshProfile => {
+        if (!freshProfile) return;
+        
+        if (JSON.stringify(freshProfile) === JSON.stringify(staleProfile)) {
+          console.log(`[DEBUG] Refreshed profile for ${username} is unchanged`);
+          return;
+        }
+        if (!this.isDisplayingTwitterInfo || this.displayedProfileUsername !== username) {
+          console.log(`[DEBUG] Refreshed profile for ${username} arrived after the user moved on`);
+          return;
+        }
+        
+        console.log(`[DEBUG] Refreshed profile for ${username} changed, updating display`);
+        this.displayProfile(session, freshProfile, "(updated)");
+      });
+  }
+  
+  /**
+   * Chunk a profile for reading and start showing it
+   */
+  private displayProfile(session: TpaSession, profileInfo: TwitterProfile, note?: string): void {
+    // Format the profile information
+    let profileText = `Twitter Profile: @${profileInfo.username}${note ? ` ${note}` : ''}\n\n`;
+    profileText += `${profileInfo.description}\n\n`;
+    
+    // Add posts
+    if (profileInfo.posts && profileInfo.posts.length > 0) {
+      profileText += "Recent Posts:\n\n";
+      
+      profileInfo.posts.forEach(post => {
+        profileText += `${post.date}\n${post.content}\n\n`;
+      });
+    } else {
+      profileText += "No recent posts found.";
+    }
+    
+    console.log("[DEBUG] Formatted profile text:", profileText);
+    
+    // Chunk the text for better readability
+    this.twitterChunks = this.chunkText(profileText, 500, 200);
+    this.currentChunkIndex = 0;
+    
+    console.log(`[DEBUG] Chunked Twitter profile into ${this.twitterChunks.length} parts`);
+    
+    // Display the first chunk immediately
+    this.displayTwitterChunk(session);
+    
+    // Start auto-advancing through the chunks
+    this.startAutoAdvance(session);
+  }
+  
   /**
    * Format Twitter profile data into readable text
    */
@@ -577,13 +639,78 @@ class TwitterGlassesApp extends TpaServer {
         console.log("Confirmation timed out");
         this.isAwaitingConfirmation = false;
         this.pendingUsername = null;
+        this.cancelSpeculativeLookup();
         session.layouts.showTextWall("Twitter profile lookup timed out. Please try again.");
       }
     }, 15000);
     
+    this.startSpeculativeLookup(twitterAgent, username);
+    
     session.layouts.showTextWall(`Did you want to look up "${username}"? Please say yes or no.`);
   }
 
+  /**
+   * Start looking up a username before the user confirms it, replacing any
+   * earlier speculative lookup
+   */
+  private startSpeculativeLookup(twitterAgent: TwitterAgent, username: string): void {
+    this.cancelSpeculativeLookup();
+    if (!this.speculativePrefetch) return;
+    
+    // Nothing to gain when the cache can already answer
+    const cached = twitterAgent.getCachedProfile(username);
+    if (cached && !cached.stale) return;
+    
+    console.log(`[DEBUG] Starting speculative lookup for: "${username}"`);
+    const controller = new AbortController();
+    const speculation = { username, controller, outcome: 'running' as SpeculationOutcome };
+    this.speculativeLookup = speculation;
+    this.speculationStats.started++;
+    twitterAgent.prefetchProfile(username, controller.signal).then((profile) => {
+      speculation.outcome = profile ? 'found' : 'failed';
+    });
+  }
+  
+  /**
+   * The user confirmed a lookup. fetchTwitterProfile has already joined the
+   * speculative run (or found its result in the cache), so just let go of it.
+   * It only counts as a hit if it is still running or left its result in the cache.
+   */
+  private claimSpeculativeLookup(twitterAgent: TwitterAgent, username: string): void {
+    const speculation = this.speculativeLookup;
+    if (!speculation) return;
+    
+    if (speculation.username !== username) {
+      this.cancelSpeculativeLookup();
+      return;
+    }
+    
+    this.speculativeLookup = null;
+    const cached = speculation.outcome === 'found' ? twitterAgent.getCachedProfile(username) : null;
+    if (speculation.outcome === 'running' || (cached && !cached.stale)) {
+      this.speculationStats.hits++;
+      console.log(`[DEBUG] Speculative lookup hit for "${username}" (${this.speculationStats.hits} hits, ${this.speculationStats.wasted} wasted)`);
+    } else {
+      this.speculationStats.wasted++;
+      console.log(`[DEBUG] Speculative lookup for "${username}" ${speculation.outcome} without a usable result (${this.speculationStats.wasted} wasted)`);
+    }
+    // Only detaches the prefetch: the confirmed lookup keeps the run alive
+    speculation.controller.abort();
+  }
+  
+  /**
+   * Drop the speculative lookup; its browser is freed unless someone else joined the run
+   */
+  private cancelSpeculativeLookup(): void {
+    const speculation = this.speculativeLookup;
+    if (!speculation) return;
+    
+    this.speculativeLookup = null;
+    this.speculationStats.wasted++;
+    console.log(`[DEBUG] Cancelling speculative lookup for "${speculation.username}" (${this.speculationStats.wasted} wasted)`);
+    speculation.controller.abort();
+  }
+
   private handleShitpostCommand(session: TpaSession, twitterAgent: TwitterAgent, text: string): void {
     console.log("[DEBUG] Shitpost command handler called with:", text);
     
@@ -602,111 +729,16 @@ class TwitterGlassesApp extends TpaServer {
     
     console.log("[DEBUG] Extracted shitpost text:", postText);
     
-    // Call the Python script to post the tweet
-    this.sendShitpost(session, postText)
-      .then(() => {
-        session.layouts.showTextWall(`Successfully posted: "${postText}"`);
-      })
-      .catch(error => {
-        console.error("[DEBUG] Error posting shitpost:", error);
-        session.layouts.showTextWall(`Error posting to Twitter: ${error.message}`);
-      });
-  }
-
-  private sendShitpost(session: TpaSession, postText: string): Promise<void> {
-    return new Promise((resolve, reject) => {
-      // Sanitize the text to prevent command injection
-      const sanitizedText = postText.replace(/"/g, '\\"');
-      console.log(`[DEBUG] Running Python shitpost agent with sanitized text: "${sanitizedText}"`);
-      
-      // Path to the Python script relative to where this code will run
-      const pythonScript = path.join(__dirname, 'butwitter', 'shitpost.py');
-      
-      // Check if the script exists
-      if (!fs.existsSync(pythonScript)) {
-        console.error(`[DEBUG] Python script not found at: ${pythonScript}`);
-        reject(new Error(`Python script not found at: ${pythonScript}`));
-        return;
-      }
-      
-      console.log(`[DEBUG] Running Python shitpost script: ${pythonScript}`);
-      
-      // Try different Python executable names (same as in TwitterAgent)
-      const pythonCommands = ['python3', 'python', 'py'];
-      let pythonProcess = null;
-      let errorOutput = '';
-      
-      // Try each Python command until one works
-      for (const cmd of pythonCommands) {
-        try {
-          console.log(`[DEBUG] Attempting to run with ${cmd}...`);
-          pythonProcess = spawn(cmd, [pythonScript, sanitizedText]);
-          console.log(`[DEBUG] Spawn successful with ${cmd}`);
-          break; // If spawn doesn't throw, we found a working command
-        } catch (error) {
-          console.log(`[DEBUG] Command ${cmd} failed: ${error.message}`);
-          errorOutput += `Failed to run with ${cmd}: ${error.message}\n`;
-        }
-      }
-      
-      if (!pythonProcess) {
-        console.error("[DEBUG] Could not find Python executable");
-        reject(new Error(`Could not find Python executable. Tried: ${pythonCommands.join(', ')}. ${errorOutput}`));
-        return;
-      }
-      
-      let output = '';
-      
-      // Collect stdout data
-      pythonProcess.stdout.on('data', (data) => {
-        const chunk = data.toString();
-        console.log(`Python output: ${chunk}`);
-        output += chunk;
-      });
-      
-      // Collect stderr data
-      pythonProcess.stderr.on('data', (data) => {
-        const chunk = data.toString();
-        console.error(`Python error: ${chunk}`);
-        errorOutput += chunk;
-      });
-      
-      // Add a timeout to kill the process if it takes too long
-      const processTimeout = setTimeout(() => {
-        if (pythonProcess) {
-          console.error("[DEBUG] Python shitpost process timed out after 120 seconds");
-          pythonProcess.kill();
-          reject(new Error("Python process timed out after 120 seconds"));
-        }
-      }, 120000); // 120 second timeout (2 minutes)
-      
-      // Handle process completion
-      pythonProcess.on('close', (code) => {
-        clearTimeout(processTimeout); // Clear the timeout
-        console.log(`[DEBUG] Python shitpost process exited with code ${code}`);
-        if (code === 0) {
-          resolve();
+    // Call the Python script to post the tweet; it streams progress to the glasses
+    // and shows its own error message if posting fails
+    twitterAgent.postTweet(postText)
+      .then(result => {
+        if (result.success) {
+          session.layouts.showTextWall(`Successfully posted: "${postText}"`);
         } else {
-          if (errorOutput.includes('No module named')) {
-            const missingModule = errorOutput.match(/No module named '([^']+)'/);
-            const moduleMessage = missingModule ? missingModule[1] : 'required modules';
-            
-            const installMessage = `Python module(s) missing. Please run: pip3 install ${moduleMessage}`;
-            console.error(installMessage);
-            reject(new Error(`${installMessage}\n\nFull error: ${errorOutput}`));
-          } else {
-            reject(new Error(`Python process exited with code ${code}: ${errorOutput}`));
-          }
+          console.error("[DEBUG] Error posting shitpost:", result.message);
         }
       });
-      
-      // Handle process errors
-      pythonProcess.on('error', (error) => {
-        clearTimeout(processTimeout); // Clear the timeout
-        console.error(`[DEBUG] Failed to start Python shitpost process: ${error.message}`);
-        reject(new Error(`Failed to start Python process: ${error.message}`));
-      });
-    });
   }
 }
 
@@ -0,0 +1,86 @@
+import { Database } from 'bun:sqlite';
+import * as path from 'path';
+import type { TwitterProfile } from './twitterAgent';
+
+// Same file, schema and defaults as butwitter/profile_cache.py, which writes
+// a profile after every successful agent run
+const CACHE_PATH = process.env.PROFILE_CACHE_PATH || path.join(__dirname, 'butwitter', '.profile_cache.sqlite3');
+const CACHE_TTL_SECONDS = Number(process.env.PROFILE_CACHE_TTL || 3600);
+
+const SCHEMA = `
+CREATE TABLE IF NOT EXISTS profiles (
+    username TEXT PRIMARY KEY,
+    profile TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS profiles_last_access ON profiles (last_access);
+`;
+
+export interface CachedProfile {
+  profile: TwitterProfile;
+  ageSeconds: number;
+  // Older than the TTL; only returned when the caller asks for stale entries
+  stale: boolean;
+}
+
+/**
+ * Normalize a username the same way the Python cache does
+ * @param username The username as spoken or typed
+ * @returns The cache key
+ */
+export function normalizeUsername(username: string): string {
+  return username.trim().replace(/^@+/, '').toLowerCase().replace(/[^a-z0-9_]/g, '');
+}
+
+/**
+ * Read side of the on-disk profile cache shared with the Python agent
+ */
+export class ProfileCache {
+  private db: Database;
+  private ttlSeconds: number;
+  public hits = 0;
+  public misses = 0;
+
+  constructor(dbPath: string = CACHE_PATH, ttlSeconds: number = CACHE_TTL_SECONDS) {
+    this.db = new Database(dbPath, { create: true });
+    this.db.exec('PRAGMA journal_mode=WAL');
+    this.db.exec(SCHEMA);
+    this.ttlSeconds = ttlSeconds;
+  }
+
+  /**
+   * Look up a profile, counting it as a use for LRU eviction
+   * @param username The Twitter username to look up
+   * @param allowStale Also return entries older than the TTL, marked as stale
+   * @returns The cached profile, or null when missing (or expired without allowStale)
+   */
+  public get(username: string, allowStale: boolean = false): CachedProfile | null {
+    const key = normalizeUsername(username);
+    const now = Date.now() / 1000;
+    const row = this.db
+      .query('SELECT profile, fetched_at FROM profiles WHERE username = ?')
+      .get(key) as { profile: string; fetched_at: number } | null;
+
+    const ageSeconds = row ? now - row.fetched_at : 0;
+    const stale = ageSeconds > this.ttlSeconds;
+    if (!row || (stale && !allowStale)) {
+      this.misses++;
+      return null;
+    }
+
+    this.db.query('UPDATE profiles SET last_access = ? WHERE username = ?').run(now, key);
+    this.hits++;
+    return { profile: JSON.parse(row.profile), ageSeconds, stale };
+  }
+}
+
+// One connection shared by every session
+let sharedCache: ProfileCache | null = null;
+
+export function getProfileCache(): ProfileCache {
+  if (!sharedCache) {
+    sharedCache = new ProfileCache();
+  }
+  return sharedCache;
+}
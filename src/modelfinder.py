@@ -1,17 +1,50 @@
-from langchain_openai import ChatOpenAI
-from browser_use import Agent
+import argparse
 import asyncio
-from dotenv import load_dotenv
+import os
+import sys
 
-load_dotenv()
+# resource_policy.py, model_tiers.py, page_state.py and run_metrics.py are
+# shared with the x.com agents in butwitter/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "butwitter"))
 
 
 async def main():
-    agent = Agent(
-        task="go to thingiverse.com, click allow all, click on the search bar, enter in the text you've recieved, and then hit enter, if there are ads or if it asks you to get a membership, close it, then choose the first thing, then hit download all files, then hit save then log out that file path",
-        llm=ChatOpenAI(model="gpt-4o"),
-    )
-    await agent.run()
+    # Deferred so --help doesn't pay for langchain/browser_use imports
+    from browser_use import Agent, Browser
+    from model_tiers import run_tiered
+    from page_state import install_state_filters, state_filters
+    from resource_policy import block_resources
+    from run_metrics import RunMetrics
 
+    browser = Browser()
+    try:
+        browser_context = await browser.new_context()
+        # Ad and tracker requests never load, so there is less for the agent to close
+        await block_resources(browser_context)
+        filters = state_filters("modelfinder")
 
-asyncio.run(main())
+        async def attempt(llm, max_steps):
+            agent = Agent(
+                task="go to thingiverse.com, click allow all, click on the search bar, enter in the text you've recieved, and then hit enter, if there are ads or if it asks you to get a membership, close it, then choose the first thing, then hit download all files, then hit save then log out that file path",
+                llm=llm,
+                browser_context=browser_context,
+            )
+            install_state_filters(agent, *filters)
+            return await agent.run(max_steps=max_steps)
+
+        async def validate(history):
+            # is_done() also holds for done(success=False)
+            if not history.is_successful():
+                raise RuntimeError("agent didn't report downloading the model")
+            return history
+
+        await run_tiered("modelfinder", attempt, validate, metrics=RunMetrics())
+    finally:
+        await browser.close()
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    argparse.ArgumentParser(description="Find and download a model from Thingiverse with a browser agent").parse_args()
+    asyncio.run(main())
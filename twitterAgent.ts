@@ -1,9 +1,12 @@
 import { TpaSession } from '@augmentos/sdk';
-import { spawn } from 'child_process';
+import { spawn, ChildProcess } from 'child_process';
 import * as path from 'path';
 import * as fs from 'fs';
+import * as net from 'net';
+import { getProfileCache, CachedProfile, normalizeUsername } from './profileCache';
 
-interface TwitterProfile {
+// Mirrors the TwitterProfile model in butwitter/profile_schema.py
+export interface TwitterProfile {
   username: string;
   description: string;
   posts: {
@@ -13,6 +16,384 @@ interface TwitterProfile {
   }[];
 }
 
+// NDJSON progress event streamed by the Python agents while they work
+export interface AgentProgressEvent {
+  stage: string;
+  [key: string]: any;
+}
+
+type ProgressHandler = (event: AgentProgressEvent) => void;
+
+interface AgentTransport {
+  request(job: Record<string, unknown>, timeoutMs: number, onProgress?: ProgressHandler, signal?: AbortSignal): Promise<string>;
+}
+
+interface PendingJob {
+  resolve: (output: string) => void;
+  reject: (error: Error) => void;
+  timer: NodeJS.Timeout;
+  onProgress?: ProgressHandler;
+}
+
+/**
+ * Spawn a Python script, trying the usual executable names in turn
+ * @param args Script path followed by its arguments
+ * @returns The spawned process
+ */
+function spawnPython(args: string[]): ChildProcess {
+  const pythonCommands = ['python3', 'python', 'py'];
+  let spawnErrors = '';
+
+  for (const cmd of pythonCommands) {
+    try {
+      console.log(`[DEBUG] Attempting to run with ${cmd}...`);
+      const pythonProcess = spawn(cmd, args);
+      console.log(`[DEBUG] Spawn successful with ${cmd}`);
+      return pythonProcess; // If spawn doesn't throw, we found a working command
+    } catch (error) {
+      console.log(`[DEBUG] Command ${cmd} failed: ${error.message}`);
+      spawnErrors += `Failed to run with ${cmd}: ${error.message}\n`;
+    }
+  }
+
+  console.error("[DEBUG] Could not find Python executable");
+  throw new Error(`Could not find Python executable. Tried: ${pythonCommands.join(', ')}. ${spawnErrors}`);
+}
+
+/**
+ * Long-lived `agent.py --worker` process. Jobs are written to its stdin as
+ * JSON lines and results come back on stdout as JSON lines tagged with the job id,
+ * so the interpreter, imports and LLM client are set up once instead of per lookup.
+ */
+class PythonWorker implements AgentTransport {
+  private scriptPath: string;
+  private process: ChildProcess | null = null;
+  private pending = new Map<string, PendingJob>();
+  private nextJobId = 1;
+  private stdoutBuffer = '';
+  private errorOutput = '';
+
+  constructor(scriptPath: string) {
+    this.scriptPath = scriptPath;
+  }
+
+  /**
+   * Send a job to the worker, starting it first if it isn't running
+   * @param job The job payload (e.g. { username })
+   * @param timeoutMs How long to wait for the job's result
+   * @param onProgress Called for each progress event the job emits
+   * @param signal Aborting it cancels the job in the worker
+   * @returns Promise with the job's output
+   */
+  public request(job: Record<string, unknown>, timeoutMs: number, onProgress?: ProgressHandler, signal?: AbortSignal): Promise<string> {
+    return new Promise((resolve, reject) => {
+      let worker: ChildProcess;
+      try {
+        worker = this.ensureStarted();
+      } catch (error) {
+        reject(error);
+        return;
+      }
+
+      const id = String(this.nextJobId++);
+      const timer = setTimeout(() => {
+        if (this.pending.delete(id)) {
+          console.error(`[DEBUG] Python worker job ${id} timed out after ${timeoutMs / 1000} seconds`);
+          this.send({ type: 'cancel', id });
+          reject(new Error(`Python process timed out after ${timeoutMs / 1000} seconds`));
+        }
+      }, timeoutMs);
+
+      this.pending.set(id, { resolve, reject, timer, onProgress });
+      console.log(`[DEBUG] Sending job ${id} to Python worker (pid ${worker.pid})`);
+      this.send({ ...job, id });
+
+      // The worker cancels the job's task, which hands its browser context back to the pool
+      signal?.addEventListener('abort', () => {
+        if (this.pending.delete(id)) {
+          console.log(`[DEBUG] Cancelling Python worker job ${id}`);
+          clearTimeout(timer);
+          this.send({ type: 'cancel', id });
+          reject(new Error('Lookup cancelled'));
+        }
+      }, { once: true });
+    });
+  }
+
+  private send(message: Record<string, unknown>): void {
+    this.process?.stdin?.write(JSON.stringify(message) + '\n');
+  }
+
+  private ensureStarted(): ChildProcess {
+    if (this.process) {
+      return this.process;
+    }
+
+    // Check if the script exists
+    if (!fs.existsSync(this.scriptPath)) {
+      console.error(`[DEBUG] Python script not found at: ${this.scriptPath}`);
+      throw new Error(`Python script not found at: ${this.scriptPath}`);
+    }
+
+    const pythonProcess = spawnPython([this.scriptPath, '--worker']);
+    this.process = pythonProcess;
+    this.stdoutBuffer = '';
+    this.errorOutput = '';
+
+    pythonProcess.stdout!.on('data', (data) => this.handleStdout(data.toString()));
+
+    pythonProcess.stderr!.on('data', (data) => {
+      const chunk = data.toString();
+      console.error(`Python error: ${chunk}`);
+      // Only keep the tail, the worker lives for a long time
+      this.errorOutput = (this.errorOutput + chunk).slice(-10000);
+    });
+
+    pythonProcess.on('close', (code) => {
+      console.log(`[DEBUG] Python worker exited with code ${code}`);
+      this.process = null;
+      this.failAll(this.exitError(code));
+    });
+
+    pythonProcess.on('error', (error) => {
+      console.error(`[DEBUG] Failed to start Python worker: ${error.message}`);
+      this.process = null;
+      this.failAll(new Error(`Failed to start Python process: ${error.message}`));
+    });
+
+    return pythonProcess;
+  }
+
+  private handleStdout(chunk: string): void {
+    this.stdoutBuffer += chunk;
+    const lines = this.stdoutBuffer.split('\n');
+    this.stdoutBuffer = lines.pop() || '';
+
+    for (const line of lines) {
+      if (!line.trim()) continue;
+
+      let message: any;
+      try {
+        message = JSON.parse(line);
+      } catch {
+        console.log(`Python output: ${line}`);
+        continue;
+      }
+
+      if (message.type === 'ready') {
+        console.log(`[DEBUG] Python worker ready (pid ${message.pid})`);
+        continue;
+      }
+
+      const job = message.id !== undefined ? this.pending.get(String(message.id)) : undefined;
+      if (!job) {
+        if (message.type === 'error') {
+          console.error(`[DEBUG] Python worker error: ${message.error}`);
+        }
+        continue;
+      }
+
+      if (message.type === 'progress') {
+        job.onProgress?.(message);
+        continue;
+      }
+
+      this.pending.delete(String(message.id));
+      clearTimeout(job.timer);
+      if (message.type === 'result') {
+        job.resolve(String(message.result).trim());
+      } else {
+        job.reject(new Error(`Python agent failed: ${message.error}`));
+      }
+    }
+  }
+
+  private exitError(code: number | null): Error {
+    if (this.errorOutput.includes('No module named')) {
+      const missingModule = this.errorOutput.match(/No module named '([^']+)'/);
+      const moduleMessage = missingModule ? missingModule[1] : 'required modules';
+
+      const installMessage = `Python module(s) missing. Please run: pip3 install ${moduleMessage}`;
+      console.error(installMessage);
+      return new Error(`${installMessage}\n\nFull error: ${this.errorOutput}`);
+    }
+    return new Error(`Python process exited with code ${code}: ${this.errorOutput}`);
+  }
+
+  private failAll(error: Error): void {
+    for (const job of this.pending.values()) {
+      clearTimeout(job.timer);
+      job.reject(error);
+    }
+    this.pending.clear();
+  }
+}
+
+/**
+ * Client for `agent.py --zygote <socket>`. Each job opens a connection to the
+ * zygote, which forks a pre-imported child to run it; closing the connection
+ * cancels the job. The zygote is started on first use if nothing is listening.
+ */
+class ZygoteClient implements AgentTransport {
+  private socketPath: string;
+  private scriptPath: string;
+  private starting: Promise<void> | null = null;
+  private nextJobId = 1;
+
+  constructor(socketPath: string, scriptPath: string) {
+    this.socketPath = socketPath;
+    this.scriptPath = scriptPath;
+  }
+
+  public async request(job: Record<string, unknown>, timeoutMs: number, onProgress?: ProgressHandler, signal?: AbortSignal): Promise<string> {
+    const id = String(this.nextJobId++);
+    try {
+      return await this.send({ ...job, id }, timeoutMs, onProgress, signal);
+    } catch (error) {
+      if (error.code !== 'ENOENT' && error.code !== 'ECONNREFUSED') {
+        throw error;
+      }
+      console.log(`[DEBUG] No zygote listening on ${this.socketPath}, starting one`);
+      await this.start();
+      return this.send({ ...job, id }, timeoutMs, onProgress, signal);
+    }
+  }
+
+  private send(job: Record<string, unknown>, timeoutMs: number, onProgress?: ProgressHandler, signal?: AbortSignal): Promise<string> {
+    return new Promise((resolve, reject) => {
+      const socket = net.createConnection(this.socketPath);
+      let buffer = '';
+      let settled = false;
+
+      const finish = (error: Error | null, output?: string) => {
+        if (settled) return;
+        settled = true;
+        clearTimeout(timer);
+        socket.destroy();
+        if (error) {
+          reject(error);
+        } else {
+          resolve(output!.trim());
+        }
+      };
+
+      // Destroying the socket makes the zygote child cancel the job
+      const timer = setTimeout(() => {
+        console.error(`[DEBUG] Zygote job ${job.id} timed out after ${timeoutMs / 1000} seconds`);
+        finish(new Error(`Python process timed out after ${timeoutMs / 1000} seconds`));
+      }, timeoutMs);
+
+      socket.on('connect', () => {
+        socket.write(JSON.stringify(job) + '\n');
+      });
+
+      socket.on('data', (data) => {
+        buffer += data.toString();
+        const lines = buffer.split('\n');
+        buffer = lines.pop() || '';
+        for (const line of lines) {
+          if (!line.trim()) continue;
+
+          let message: any;
+          try {
+            message = JSON.parse(line);
+          } catch {
+            console.log(`Zygote output: ${line}`);
+            continue;
+          }
+
+          if (message.type === 'started') {
+            console.log(`[DEBUG] Zygote forked pid ${message.pid} for job ${job.id}`);
+          } else if (message.type === 'progress') {
+            onProgress?.(message);
+          } else if (message.type === 'result') {
+            finish(null, String(message.result));
+          } else if (message.type === 'error') {
+            finish(new Error(`Python agent failed: ${message.error}`));
+          }
+        }
+      });
+
+      socket.on('close', () => {
+        finish(new Error(`Zygote closed the connection before job ${job.id} finished`));
+      });
+
+      socket.on('error', (error) => finish(error));
+
+      signal?.addEventListener('abort', () => finish(new Error('Lookup cancelled')), { once: true });
+    });
+  }
+
+  private start(): Promise<void> {
+    if (!this.starting) {
+      this.starting = new Promise<void>((resolve, reject) => {
+        const zygote = spawnPython([this.scriptPath, '--zygote', this.socketPath]);
+        let errorOutput = '';
+
+        zygote.stdout!.on('data', (data) => {
+          if (data.toString().includes('"ready"')) {
+            console.log(`[DEBUG] Zygote ready on ${this.socketPath} (pid ${zygote.pid})`);
+            resolve();
+          }
+        });
+        zygote.stderr!.on('data', (data) => {
+          const chunk = data.toString();
+          console.error(`Python zygote error: ${chunk}`);
+          errorOutput = (errorOutput + chunk).slice(-10000);
+        });
+        zygote.on('close', (code) => {
+          console.log(`[DEBUG] Python zygote exited with code ${code}`);
+          this.starting = null;
+          reject(new Error(`Python zygote exited with code ${code}: ${errorOutput}`));
+        });
+        zygote.on('error', (error) => {
+          this.starting = null;
+          reject(new Error(`Failed to start Python zygote: ${error.message}`));
+        });
+      });
+    }
+    return this.starting;
+  }
+}
+
+// Shared by every TwitterAgent so all sessions reuse the same warm worker.
+// Setting TWITTER_AGENT_ZYGOTE_SOCKET switches to the fork-per-job zygote instead.
+let profileWorker: AgentTransport | null = null;
+
+function getProfileWorker(): AgentTransport {
+  if (!profileWorker) {
+    const scriptPath = path.join(__dirname, 'butwitter', 'agent.py');
+    const zygoteSocket = process.env.TWITTER_AGENT_ZYGOTE_SOCKET;
+    profileWorker = zygoteSocket ? new ZygoteClient(zygoteSocket, scriptPath) : new PythonWorker(scriptPath);
+  }
+  return profileWorker;
+}
+
+interface InFlightLookup {
+  promise: Promise<string>;
+  listeners: Set<ProgressHandler>;
+  // Callers still waiting on the run; the run is cancelled when the last one aborts
+  subscribers: number;
+  controller: AbortController;
+}
+
+// Single-flight table: concurrent lookups of the same username (from any
+// session) share one agent run instead of each starting a browser
+const inFlightLookups = new Map<string, InFlightLookup>();
+
+const lookupStats = {
+  started: 0,   // lookups that started an agent run
+  coalesced: 0  // lookups that attached to a run already in flight
+};
+
+/**
+ * Counters for the single-flight lookup table
+ * @returns How many lookups started an agent run and how many were coalesced
+ */
+export function getLookupStats(): { started: number; coalesced: number; inFlight: number } {
+  return { ...lookupStats, inFlight: inFlightLookups.size };
+}
+
 export class TwitterAgent {
   private session: TpaSession;
   
@@ -23,121 +404,29 @@ export class TwitterAgent {
   /**
    * Get Twitter profile information for a specified username
    * @param username The Twitter username to look up
-   * @returns Promise with the profile information text
+   * @returns Promise with the profile information
    */
   public async getProfileInfo(username: string): Promise<TwitterProfile | null> {
+    // A cache hit answers in milliseconds without touching the browser agent
+    try {
+      const cached = getProfileCache().get(username);
+      if (cached) {
+        console.log(`[DEBUG] Profile cache hit for ${username} (${Math.round(cached.ageSeconds)}s old)`);
+        return cached.profile;
+      }
+    } catch (error) {
+      console.error('Profile cache error:', error);
+    }
+    
     this.session.layouts.showTextWall(`Fetching Twitter profile for ${username}...`);
     
     try {
-      const result = await this.runPythonAgent(username);
+      const result = await this.runPythonAgent(username, (event) => this.showProfileProgress(username, event));
       console.log("Raw result from Python agent:", result);
       
-      // Try to parse the JSON from the result
-      try {
-        // Extract JSON from the text response
-        const jsonMatch = result.match(/\{[\s\S]*\}/);
-        if (jsonMatch) {
-          try {
-            const jsonStr = jsonMatch[0];
-            const data = JSON.parse(jsonStr);
-            
-            // Extract the relevant information
-            const profile: TwitterProfile = {
-              username: data.Grok_Chat_Tab?.Username || data["Grok Chat Tab"]?.Username || "Unknown",
-              description: data.Grok_Chat_Tab?.Description || data["Grok Chat Tab"]?.Description || "No description available",
-              posts: []
-            };
-            
-            // Extract posts
-            const posts = data.Grok_Chat_Tab?.Posts || data["Grok Chat Tab"]?.Posts || [];
-            profile.posts = posts.map((post: any) => ({
-              date: post.Date || "",
-              content: post.Content || "",
-              link: post.Link || ""
-            }));
-            
-            return profile;
-          } catch (jsonError) {
-            console.error("JSON parsing error:", jsonError);
-            // Fall through to text extraction
-          }
-        }
-        
-        // If JSON parsing fails, try to extract information from the text
-        console.log("Falling back to text extraction");
-        
-        // Extract username
-        let username = "Unknown";
-        const usernameMatch = result.match(/Username: ([^\n]+)/);
-        if (usernameMatch) {
-          username = usernameMatch[1];
-        }
-        
-        // Extract description
-        let description = "No description available";
-        const descriptionMatch = result.match(/Description: ([^\n]+)/);
-        if (descriptionMatch) {
-          description = descriptionMatch[1];
-        } else {
-          // Try to find any paragraph that might be a description
-          const lines = result.split('\n');
-          for (const line of lines) {
-            if (line.length > 50 && !line.includes('Date:') && !line.includes('Content:')) {
-              description = line.trim();
-              break;
-            }
-          }
-        }
-        
-        // Extract posts
-        const posts = [];
-        const postMatches = result.matchAll(/Date: ([^\n]+)[\s\S]*?Content: ([^\n]+)/g);
-        for (const match of postMatches) {
-          posts.push({
-            date: match[1],
-            content: match[2],
-            link: ""
-          });
-        }
-        
-        // If no posts were found, try to extract any content that looks like posts
-        if (posts.length === 0) {
-          const lines = result.split('\n');
-          for (let i = 0; i < lines.length; i++) {
-            const line = lines[i].trim();
-            if (line.match(/^(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)/)) {
-              posts.push({
-                date: line,
-                content: lines[i+1]?.trim() || "",
-                link: ""
-              });
-              i++; // Skip the next line
-            }
-          }
-        }
-        
-        return {
-          username,
-          description,
-          posts: posts.length > 0 ? posts : [{
-            date: "N/A",
-            content: "No posts found",
-            link: ""
-          }]
-        };
-      } catch (parseError) {
-        console.error('Error parsing Twitter profile data:', parseError);
-        // If all parsing fails, return the raw text
-        return {
-          username: username,
-          description: "Raw profile data",
-          posts: [{
-            date: "N/A",
-            content: result,
-            link: ""
-          }]
-        };
-      }
+      // agent.py validates against its TwitterProfile model before emitting,
+      // so the result is always exactly one JSON document
+      return JSON.parse(result) as TwitterProfile;
     } catch (error) {
       this.session.layouts.showTextWall(`Error fetching Twitter profile: ${error.message}`);
       console.error('Twitter agent error:', error);
@@ -145,104 +434,147 @@ export class TwitterAgent {
     }
   }
   
+  /**
+   * Read a profile from the on-disk cache, including entries past their TTL
+   * @param username The Twitter username to look up
+   * @returns The cached profile (check `stale`), or null if it was never fetched
+   */
+  public getCachedProfile(username: string): CachedProfile | null {
+    try {
+      return getProfileCache().get(username, true);
+    } catch (error) {
+      console.error('Profile cache error:', error);
+      return null;
+    }
+  }
+  
+  /**
+   * Fetch a fresh copy of a profile in the background, bypassing the cache.
+   * Unlike getProfileInfo this shows nothing on the glasses while it runs.
+   * @param username The Twitter username to look up
+   * @returns Promise with the refreshed profile, or null if the lookup failed
+   */
+  public async refreshProfile(username: string): Promise<TwitterProfile | null> {
+    try {
+      const result = await this.runPythonAgent(username, undefined, true);
+      return JSON.parse(result) as TwitterProfile;
+    } catch (error) {
+      console.error(`Background refresh of ${username} failed:`, error);
+      return null;
+    }
+  }
+  
+  /**
+   * Start a lookup speculatively, before the user has confirmed it. Nothing is
+   * shown on the glasses; a later getProfileInfo for the same username joins
+   * the run, or finds its result in the cache.
+   * @param username The Twitter username to look up
+   * @param signal Aborting it cancels the run unless another lookup has joined it
+   * @returns Promise with the profile, or null if the lookup failed or was cancelled
+   */
+  public async prefetchProfile(username: string, signal: AbortSignal): Promise<TwitterProfile | null> {
+    try {
+      const result = await this.runPythonAgent(username, undefined, false, signal);
+      return JSON.parse(result) as TwitterProfile;
+    } catch (error) {
+      if (!signal.aborted) {
+        console.error(`Speculative lookup of ${username} failed:`, error);
+      }
+      return null;
+    }
+  }
+  
+  /**
+   * Show a profile lookup progress event on the glasses
+   * @param username The Twitter username being looked up
+   * @param event The progress event from the Python agent
+   */
+  private showProfileProgress(username: string, event: AgentProgressEvent): void {
+    console.log(`[DEBUG] Profile lookup progress for ${username}: ${event.stage}`);
+    
+    switch (event.stage) {
+      case 'logged_in':
+        this.session.layouts.showTextWall(`Logged in, searching for ${username}...`);
+        break;
+      case 'on_profile':
+        this.session.layouts.showTextWall(`Found @${username}, opening profile summary...`);
+        break;
+      case 'summary':
+        // Grok streams the summary in, show the latest part of what we have so far
+        this.session.layouts.showTextWall(`@${username}\n\n${event.text.slice(-500)}`);
+        break;
+      case 'post':
+        this.session.layouts.showTextWall(`Post ${event.index + 1}: ${event.post.date}\n${event.post.content}`);
+        break;
+    }
+  }
+  
   /**
    * Runs the Python Twitter agent with the given username
    * @param username The Twitter username to look up
+   * @param onProgress Called for each progress event the agent emits
+   * @param refresh Skip the agent's own cache check and always run the browser
+   * @param signal Aborting it detaches this caller; the run is cancelled once no caller is left
    * @returns Promise with the agent's output
    */
-  private runPythonAgent(username: string): Promise<string> {
-    return new Promise((resolve, reject) => {
-      // Sanitize the username to prevent command injection
-      const sanitizedUsername = username.replace(/[^a-zA-Z0-9_]/g, '');
+  private runPythonAgent(username: string, onProgress?: ProgressHandler, refresh: boolean = false, signal?: AbortSignal): Promise<string> {
+    // Sanitize the username to prevent command injection
+    const sanitizedUsername = username.replace(/[^a-zA-Z0-9_]/g, '');
+    
+    // Attach to an identical lookup that is already running. A refresh must
+    // not join a lookup that may answer from the cache, but anyone can join a refresh.
+    const normalized = normalizeUsername(sanitizedUsername);
+    const key = refresh ? `${normalized}:refresh` : normalized;
+    let lookup = inFlightLookups.get(key) ?? (refresh ? undefined : inFlightLookups.get(`${normalized}:refresh`));
+    if (lookup) {
+      lookupStats.coalesced++;
+      console.log(`[DEBUG] Joining in-flight lookup for "${sanitizedUsername}" (${lookupStats.coalesced} coalesced so far)`);
+    } else {
       console.log(`[DEBUG] Running Python agent with sanitized username: "${sanitizedUsername}"`);
+      const listeners = new Set<ProgressHandler>();
+      const controller = new AbortController();
+      const promise = getProfileWorker()
+        .request({ username: sanitizedUsername, refresh }, 120000, (event) => {
+          listeners.forEach(listener => listener(event));
+        }, controller.signal)
+        .finally(() => {
+          if (inFlightLookups.get(key)?.promise === promise) {
+            inFlightLookups.delete(key);
+          }
+        });
       
-      // Path to the Python script relative to where this code will run
-      const pythonScript = path.join(__dirname, 'butwitter', 'agent.py');
-      
-      // Check if the script exists
-      if (!fs.existsSync(pythonScript)) {
-        console.error(`[DEBUG] Python script not found at: ${pythonScript}`);
-        reject(new Error(`Python script not found at: ${pythonScript}`));
-        return;
-      }
-      
-      console.log(`[DEBUG] Running Python script: ${pythonScript}`);
-      
-      // Try different Python executable names
-      const pythonCommands = ['python3', 'python', 'py'];
-      let pythonProcess = null;
-      let errorOutput = '';
-      
-      // Try each Python command until one works
-      for (const cmd of pythonCommands) {
-        try {
-          console.log(`[DEBUG] Attempting to run with ${cmd}...`);
-          pythonProcess = spawn(cmd, [pythonScript, sanitizedUsername]);
-          console.log(`[DEBUG] Spawn successful with ${cmd}`);
-          break; // If spawn doesn't throw, we found a working command
-        } catch (error) {
-          console.log(`[DEBUG] Command ${cmd} failed: ${error.message}`);
-          errorOutput += `Failed to run with ${cmd}: ${error.message}\n`;
+      lookup = { promise, listeners, subscribers: 0, controller };
+      inFlightLookups.set(key, lookup);
+      lookupStats.started++;
+    }
+    
+    const run = lookup;
+    run.subscribers++;
+    if (onProgress) {
+      run.listeners.add(onProgress);
+    }
+    if (!signal) {
+      return run.promise;
+    }
+    
+    return new Promise((resolve, reject) => {
+      const onAbort = () => {
+        if (onProgress) {
+          run.listeners.delete(onProgress);
         }
-      }
-      
-      if (!pythonProcess) {
-        console.error("[DEBUG] Could not find Python executable");
-        reject(new Error(`Could not find Python executable. Tried: ${pythonCommands.join(', ')}. ${errorOutput}`));
+        if (--run.subscribers === 0) {
+          run.controller.abort();
+        }
+        reject(new Error('Lookup cancelled'));
+      };
+      if (signal.aborted) {
+        onAbort();
         return;
       }
-      
-      let output = '';
-      
-      // Collect stdout data
-      pythonProcess.stdout.on('data', (data) => {
-        const chunk = data.toString();
-        console.log(`Python output: ${chunk}`);
-        output += chunk;
-      });
-      
-      // Collect stderr data
-      pythonProcess.stderr.on('data', (data) => {
-        const chunk = data.toString();
-        console.error(`Python error: ${chunk}`);
-        errorOutput += chunk;
-      });
-      
-      // Add a timeout to kill the process if it takes too long
-      const processTimeout = setTimeout(() => {
-        if (pythonProcess) {
-          console.error("[DEBUG] Python process timed out after 120 seconds");
-          pythonProcess.kill();
-          reject(new Error("Python process timed out after 120 seconds"));
-        }
-      }, 120000); // 120 second timeout (2 minutes)
-      
-      // Handle process completion
-      pythonProcess.on('close', (code) => {
-        clearTimeout(processTimeout); // Clear the timeout
-        console.log(`[DEBUG] Python process exited with code ${code}`);
-        if (code === 0) {
-          resolve(output.trim());
-        } else {
-          if (errorOutput.includes('No module named')) {
-            const missingModule = errorOutput.match(/No module named '([^']+)'/);
-            const moduleMessage = missingModule ? missingModule[1] : 'required modules';
-            
-            const installMessage = `Python module(s) missing. Please run: pip3 install ${moduleMessage}`;
-            console.error(installMessage);
-            reject(new Error(`${installMessage}\n\nFull error: ${errorOutput}`));
-          } else {
-            reject(new Error(`Python process exited with code ${code}: ${errorOutput}`));
-          }
-        }
-      });
-      
-      // Handle process errors
-      pythonProcess.on('error', (error) => {
-        clearTimeout(processTimeout); // Clear the timeout
-        console.error(`[DEBUG] Failed to start Python process: ${error.message}`);
-        reject(new Error(`Failed to start Python process: ${error.message}`));
-      });
+      signal.addEventListener('abort', onAbort, { once: true });
+      run.promise
+        .then(resolve, reject)
+        .finally(() => signal.removeEventListener('abort', onAbort));
     });
   }
   
@@ -255,7 +587,14 @@ export class TwitterAgent {
     this.session.layouts.showTextWall(`Posting tweet: "${text}"...`);
     
     try {
-      const result = await this.runPythonShitposter(text);
+      const result = await this.runPythonShitposter(text, (event) => {
+        console.log(`[DEBUG] Shitpost progress: ${event.stage}`);
+        if (event.stage === 'composing') {
+          this.session.layouts.showTextWall(`Writing tweet: "${text}"...`);
+        } else if (event.stage === 'posted') {
+          this.session.layouts.showTextWall(`Tweet sent: "${text}"`);
+        }
+      });
       console.log("Raw result from Python shitposter:", result);
       
       return {
@@ -275,9 +614,10 @@ export class TwitterAgent {
   /**
    * Runs the Python shitpost agent with the given text
    * @param text The text to post as a tweet
+   * @param onProgress Called for each progress event the agent emits
    * @returns Promise with the agent's output
    */
-  private runPythonShitposter(text: string): Promise<string> {
+  private runPythonShitposter(text: string, onProgress?: ProgressHandler): Promise<string> {
     return new Promise((resolve, reject) => {
       // Sanitize the text to prevent command injection
       // Note: We're using a simple sanitization method here - for production,
@@ -306,7 +646,7 @@ export class TwitterAgent {
       for (const cmd of pythonCommands) {
         try {
           console.log(`[DEBUG] Attempting to run with ${cmd}...`);
-          pythonProcess = spawn(cmd, [pythonScript, sanitizedText]);
+          pythonProcess = spawn(cmd, [pythonScript, sanitizedText, '--progress']);
           console.log(`[DEBUG] Spawn successful with ${cmd}`);
           break; // If spawn doesn't throw, we found a working command
         } catch (error) {
@@ -322,12 +662,28 @@ export class TwitterAgent {
       }
       
       let output = '';
+      let stdoutBuffer = '';
       
-      // Collect stdout data
+      // Collect stdout data: NDJSON progress events followed by the result
       pythonProcess.stdout.on('data', (data) => {
         const chunk = data.toString();
         console.log(`Python shitpost output: ${chunk}`);
-        output += chunk;
+        stdoutBuffer += chunk;
+        const lines = stdoutBuffer.split('\n');
+        stdoutBuffer = lines.pop() || '';
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          try {
+            const message = JSON.parse(line);
+            if (message.type === 'progress') {
+              onProgress?.(message);
+            } else if (message.type === 'result') {
+              output = String(message.result);
+            }
+          } catch {
+            output += line + '\n';
+          }
+        }
       });
       
       // Collect stderr data